@@ -4,34 +4,18 @@
 # Enable nx-cugraph:
 # NETWORKX_BACKEND_PRIORITY="cugraph" python demo1.py
 #
+# The stage profiler is in the demos/ package, so run with
+# PYTHONPATH=../demos (or the path to demos/) set.
+#
 import os
-import time
-from datetime import timedelta
 
 import pandas as pd
 import networkx as nx
 
+from wikigraph.profiling import Profiler
 
-class Timer:
-    session_total = 0
-
-    def __init__(self, start_msg=""):
-        self.st = 0
-        self.start_msg = start_msg
-
-    def __enter__(self):
-        if self.start_msg:
-            print(f"\n{self.start_msg}...")
-        self.st = time.perf_counter()
-
-    def __exit__(self, exc_type, exc_value, traceback):
-        runtime = time.perf_counter() - self.st
-        Timer.session_total += runtime
-        print(f"Done in: {timedelta(seconds=runtime)}")
 
-    @classmethod
-    def print_total(cls):
-        print(f"Total time: {timedelta(seconds=cls.session_total)}")
+profiler = Profiler()
 
 
 nx.config.cache_converted_graphs = True  # This is the default in NX 3.4
@@ -41,7 +25,7 @@ nx.config.cache_converted_graphs = True  # This is the default in NX 3.4
 edgelist_csv = "enwiki-20240620-edges_2.csv"
 nodedata_csv = "enwiki-20240620-nodeids_2_2.csv"
 
-with Timer(f"Read the wikipedia connectivity information from {edgelist_csv}"):
+with profiler.stage(f"Read the wikipedia connectivity information from {edgelist_csv}"):
     edgelist_df = pd.read_csv(
         edgelist_csv,
         sep=" ",
@@ -49,7 +33,7 @@ with Timer(f"Read the wikipedia connectivity information from {edgelist_csv}"):
         dtype="int32",
     )
 
-with Timer(f"Read the wikipedia page metadata from {nodedata_csv}"):
+with profiler.stage(f"Read the wikipedia page metadata from {nodedata_csv}"):
     nodedata_df = pd.read_csv(
         nodedata_csv,
         sep="\t",
@@ -59,7 +43,7 @@ with Timer(f"Read the wikipedia page metadata from {nodedata_csv}"):
 
 """
 import nx_cugraph as nxcg
-with Timer(f"Create a nx-cugraph graph from the connectivity info"):
+with profiler.stage(f"Create a nx-cugraph graph from the connectivity info"):
     Gcg = nxcg.from_pandas_edgelist(
         edgelist_df,
         source="src",
@@ -70,7 +54,7 @@ with Timer(f"Create a nx-cugraph graph from the connectivity info"):
 # Time without cudf.pandas:  0:03:26.826157
 """
 
-with Timer(f"Create a NetworkX graph from the connectivity info"):
+with profiler.stage(f"Create a NetworkX graph from the connectivity info"):
     G = nx.from_pandas_edgelist(
         edgelist_df,
         source="src",
@@ -78,31 +62,31 @@ with Timer(f"Create a NetworkX graph from the connectivity info"):
         create_using=nx.DiGraph,
     )
 
-with Timer(f"Run NetworkX pagerank"):
+with profiler.stage(f"Run NetworkX pagerank"):
     nx_pr_vals = nx.pagerank(G)
 
 if os.environ.get("NETWORKX_BACKEND_PRIORITY") is not None:
-    with Timer(f"Run again using the cached graph conversion"):
+    with profiler.stage(f"Run again using the cached graph conversion"):
         nxcg_pr_vals = nx.pagerank(G, backend="cugraph")
 
-with Timer(f"Run NetworkX HITS"):
+with profiler.stage(f"Run NetworkX HITS"):
     (nx_hits_hubs, nx_hits_authorities) = nx.hits(G)
 
-with Timer(f"Create a DataFrame containing NetworkX results"):
+with profiler.stage(f"Create a DataFrame containing NetworkX results"):
     nx_results = pd.DataFrame([(nodeid, pagerank, nx_hits_hubs[nodeid], nx_hits_authorities[nodeid])
                                for (nodeid, pagerank) in nx_pr_vals.items()],
                               columns=["nodeid", "pagerank", "hub_val", "auth_val"])
 
-with Timer(f"Add NetworkX results to nodedata as new columns"):
+with profiler.stage(f"Add NetworkX results to nodedata as new columns"):
     nodedata_df = nodedata_df.merge(nx_results, how="left", on="nodeid")
 
-with Timer(f"Show the top 25 pages based on pagerank value"):
+with profiler.stage(f"Show the top 25 pages based on pagerank value"):
     print(nodedata_df.sort_values(by="pagerank", ascending=False).head(25))
 
-with Timer(f"Show the top 25 pages based on HITS hub value"):
+with profiler.stage(f"Show the top 25 pages based on HITS hub value"):
     print(nodedata_df.sort_values(by="hub_val", ascending=False).head(25))
 
-with Timer(f"Show the top 25 pages based on HITS authority value"):
+with profiler.stage(f"Show the top 25 pages based on HITS authority value"):
     print(nodedata_df.sort_values(by="auth_val", ascending=False).head(25))
 
-Timer.print_total()
+profiler.finish()
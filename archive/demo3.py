@@ -4,34 +4,18 @@
 # Enable nx-cugraph:
 # NETWORKX_BACKEND_PRIORITY="cugraph" python demo1.py
 #
+# The stage profiler is in the demos/ package, so run with
+# PYTHONPATH=../demos (or the path to demos/) set.
+#
 import os
-import time
-from datetime import timedelta
 
 import pandas as pd
 import networkx as nx
 
+from wikigraph.profiling import Profiler
 
-class Timer:
-    session_total = 0
-
-    def __init__(self, start_msg=""):
-        self.st = 0
-        self.start_msg = start_msg
-
-    def __enter__(self):
-        if self.start_msg:
-            print(f"\n{self.start_msg}...")
-        self.st = time.perf_counter()
-
-    def __exit__(self, exc_type, exc_value, traceback):
-        runtime = time.perf_counter() - self.st
-        Timer.session_total += runtime
-        print(f"Done in: {timedelta(seconds=runtime)}")
 
-    @classmethod
-    def print_total(cls):
-        print(f"Total time: {timedelta(seconds=cls.session_total)}")
+profiler = Profiler()
 
 
 nx.config.cache_converted_graphs = True  # This is the default in NX 3.4
@@ -41,7 +25,7 @@ nx.config.cache_converted_graphs = True  # This is the default in NX 3.4
 edgelist_csv = "enwiki-20240620-edges_2.csv"
 nodedata_csv = "enwiki-20240620-nodeids_2_2.csv"
 
-with Timer(f"Read the wikipedia connectivity information from {edgelist_csv}"):
+with profiler.stage(f"Read the wikipedia connectivity information from {edgelist_csv}"):
     edgelist_df = pd.read_csv(
         edgelist_csv,
         sep=" ",
@@ -49,7 +33,7 @@ with Timer(f"Read the wikipedia connectivity information from {edgelist_csv}"):
         dtype="int32",
     )
 
-with Timer(f"Read the wikipedia page metadata from {nodedata_csv}"):
+with profiler.stage(f"Read the wikipedia page metadata from {nodedata_csv}"):
     nodedata_df = pd.read_csv(
         nodedata_csv,
         sep="\t",
@@ -72,7 +56,7 @@ wp_namespace_filter = tuple(f"\"\'{ns}" for ns in wp_namespace_filter) + \
 
 
 print(f"\nNumber of links: {len(edgelist_df)}")
-with Timer(f"Remove pages not in the main namespace"):
+with profiler.stage(f"Remove pages not in the main namespace"):
     nodeids_to_remove = set(nodedata_df[nodedata_df["title"].str.startswith(wp_namespace_filter)]["nodeid"])
     edgelist_df = edgelist_df[~edgelist_df["src"].isin(nodeids_to_remove)]
     edgelist_df = edgelist_df[~edgelist_df["dst"].isin(nodeids_to_remove)]
@@ -82,7 +66,7 @@ print(f"Number of links: {len(edgelist_df)}")
 
 """
 import nx_cugraph as nxcg
-with Timer(f"Create a nx-cugraph graph from the connectivity info"):
+with profiler.stage(f"Create a nx-cugraph graph from the connectivity info"):
     Gcg = nxcg.from_pandas_edgelist(
         edgelist_df,
         source="src",
@@ -93,7 +77,7 @@ with Timer(f"Create a nx-cugraph graph from the connectivity info"):
 # Time without cudf.pandas:  0:03:26.826157
 """
 
-with Timer(f"Create a NetworkX graph from the connectivity info"):
+with profiler.stage(f"Create a NetworkX graph from the connectivity info"):
     G = nx.from_pandas_edgelist(
         edgelist_df,
         source="src",
@@ -101,31 +85,31 @@ with Timer(f"Create a NetworkX graph from the connectivity info"):
         create_using=nx.DiGraph,
     )
 """
-with Timer(f"Run NetworkX PageRank"):
+with profiler.stage(f"Run NetworkX PageRank"):
     nx_pr_vals = nx.pagerank(G)
 
 if os.environ.get("NETWORKX_BACKEND_PRIORITY") is not None:
-    with Timer(f"Run again using the cached graph conversion"):
+    with profiler.stage(f"Run again using the cached graph conversion"):
         nxcg_pr_vals = nx.pagerank(G, backend="cugraph")
 
-with Timer(f"Create a DataFrame containing NetworkX results"):
+with profiler.stage(f"Create a DataFrame containing NetworkX results"):
     nx_results = pd.DataFrame([items for iitems in nx_pr_vals.items()],
                               columns=["nodeid", "pagerank"])
 
-with Timer(f"Add NetworkX results to nodedata as new columns"):
+with profiler.stage(f"Add NetworkX results to nodedata as new columns"):
     nodedata_df = nodedata_df.merge(nx_results, how="left", on="nodeid")
 
-with Timer(f"Show the top 25 pages based on PageRank value"):
+with profiler.stage(f"Show the top 25 pages based on PageRank value"):
     print(nodedata_df.sort_values(by="pagerank", ascending=False).head(25))
 """
-with Timer(f"Find the nodeids for two articles in the nodedata"):
+with profiler.stage(f"Find the nodeids for two articles in the nodedata"):
     scipy_nodeid = nodedata_df.loc[nodedata_df["title"] == "\"\'SciPy\'\""]["nodeid"].values[0]
     orange_juice_nodeid = nodedata_df.loc[nodedata_df["title"] == "\"\'Orange juice\'\""]["nodeid"].values[0]
 
-with Timer(f"Find the shortest path between the two articles"):
+with profiler.stage(f"Find the shortest path between the two articles"):
     shortest_path = nx.shortest_path(G, source=scipy_nodeid, target=orange_juice_nodeid)
 
-with Timer(f"convert nodeids in the path to page titles and print the path"):
+with profiler.stage(f"convert nodeids in the path to page titles and print the path"):
     for nodeid in shortest_path:
         print(f'{nodedata_df.loc[nodedata_df["nodeid"] == nodeid]["title"].values[0]}')
 
@@ -144,15 +128,15 @@ with Timer(f"convert nodeids in the path to page titles and print the path"):
 # Verify results:
 # >>> sorted(nx_shortest_paths)==sorted(nxcg_shortest_paths)
 # True
-with Timer(f"Find the shortest path between the SciPy article and all articles"):
+with profiler.stage(f"Find the shortest path between the SciPy article and all articles"):
     nx_shortest_paths = nx.shortest_path(G, source=scipy_nodeid)
 
-with Timer(f"Create a DataFrame containing nodeids and hops from the SciPy article"):
+with profiler.stage(f"Create a DataFrame containing nodeids and hops from the SciPy article"):
     hops_df = pd.DataFrame([(nodeid, len(nx_shortest_paths[nodeid]) - 1)
                             for nodeid in nx_shortest_paths],
                            columns=["nodeid", "hops_from_scipy"])
 
-with Timer(f"Add hops to nodedata as new columns"):
+with profiler.stage(f"Add hops to nodedata as new columns"):
     nodedata_df = nodedata_df.merge(hops_df, how="left", on="nodeid")
 
 # groupby number of hops
@@ -179,7 +163,7 @@ with Timer(f"Add hops to nodedata as new columns"):
 # A node that's more hops away is nodeid 39961422
 # (this is fun since it includes Travis' article in the path)
 #
-# >>> with Timer(f"convert nodeids in the path to page titles and print the path"):
+# >>> with profiler.stage(f"convert nodeids in the path to page titles and print the path"):
 # ...  for nodeid in nx_shortest_paths[39961422]:
 # ...   print(f'{nodedata_df.loc[nodedata_df["nodeid"] == nodeid]["title"].values[0]}')
 # ...
@@ -198,4 +182,4 @@ with Timer(f"Add hops to nodedata as new columns"):
 # Done in: 0:00:00.411233
 
 
-Timer.print_total()
+profiler.finish()
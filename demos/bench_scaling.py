@@ -0,0 +1,138 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+#
+# Run the stages of demo.py on synthetic Wikipedia-like data at several scales:
+# python bench_scaling.py [--scales 1M,10M,100M] [--workdir synthetic] [--networkx 10M]
+#
+# The data for each scale is generated once (see wikigraph/synthetic.py) and
+# reused by later runs. The caches next to the data are removed before every
+# run, so the load stages measure parsing the CSV files, as on a first run of
+# the demos. Every stage reports its time, throughput and peak memory growth,
+# and the scaling exponent of each stage is fitted over the scales (1.0 means
+# the time grows linearly with the number of edges). The per-stage reports of
+# each scale are also saved as <workdir>/<scale>/profile.json, for comparison
+# with python -m wikigraph.profiling.
+#
+import argparse
+import os
+import shutil
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from wikigraph import (
+    BidirectionalBFS, CSRGraph, ConvergenceLog, bfs, convert_edgelist, influence_frame,
+    load_edge_arrays, load_edgelist, load_revisions, load_title_index, node_column,
+    pagerank_array,
+)
+from wikigraph.profiling import Profiler
+from wikigraph.synthetic import generate, parse_count
+
+
+def clear_caches(files):
+    for cache_dir in (f"{files.edgelist_csv}.cache", f"{files.nodedata_csv}.titles",
+                      f"{files.revisions_csv}.revisions"):
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def run_stages(files, profiler, networkx):
+    with profiler.stage("parse edge list") as stage:
+        stage.rows = convert_edgelist(files.edgelist_csv)["num_rows"]
+    num_edges = stage.rows
+
+    with profiler.stage("load edge list") as stage:
+        src, dst = load_edge_arrays(files.edgelist_csv)
+        stage.rows = len(src)
+
+    with profiler.stage("load title index") as stage:
+        title_index = load_title_index(files.nodedata_csv)
+        stage.rows = len(title_index)
+
+    with profiler.stage("load revisions") as stage:
+        revisions = load_revisions(files.revisions_csv, title_index)
+        stage.rows = len(revisions)
+
+    with profiler.stage("build graph", rows=num_edges):
+        G = CSRGraph.from_edgelist(src, dst)
+
+    log = ConvergenceLog()
+    with profiler.stage("pagerank") as stage:
+        pagerank = pagerank_array(G, telemetry=log)
+        stage.rows = num_edges * log.iterations
+
+    with profiler.stage("merge", rows=len(revisions)):
+        node_column(pagerank, revisions.nodeid)
+
+    with profiler.stage("groupby", rows=len(revisions)):
+        influence = revisions.editor_totals(pagerank)
+        influence_frame(revisions.editors, influence, editor_mask=~revisions.bot_mask())
+
+    with profiler.stage("shortest path", rows=num_edges):
+        BidirectionalBFS(G).paths([(0, 1), (0, 2), (0, 3)])
+        bfs(G, 0)
+
+    if networkx:
+        with profiler.stage("networkx build", rows=num_edges):
+            nx_G = nx.from_pandas_edgelist(load_edgelist(files.edgelist_csv), source="src",
+                                           target="dst", create_using=nx.DiGraph)
+        with profiler.stage("networkx pagerank", rows=num_edges):
+            nx.pagerank(nx_G)
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--scales", default="1M,10M,100M",
+                    help="comma-separated numbers of edges, e.g. 1M,10M,100M")
+parser.add_argument("--workdir", default="synthetic")
+parser.add_argument("--networkx", type=parse_count, default=parse_count("10M"),
+                    help="also run the NetworkX stages up to this many edges (0 to skip)")
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--output", help="write the results to this CSV file")
+args = parser.parse_args()
+
+# The first PageRank call pays for SciPy's first-call setup and for page-faulting
+# the arrays it touches; keep that out of the runs
+pagerank_array(CSRGraph.from_edgelist(np.array([0, 1]), np.array([1, 0])))
+
+rows = []
+for label in args.scales.split(","):
+    num_edges = parse_count(label)
+    print(f"\n{label} edges: generating data in {args.workdir}/{label}...", flush=True)
+    files = generate(os.path.join(args.workdir, label), num_edges, seed=args.seed)
+    clear_caches(files)
+
+    profiler = Profiler(verbose=False)
+    run_stages(files, profiler, networkx=num_edges <= args.networkx)
+    profiler.save(os.path.join(files.path, "profile.json"))
+
+    for stage in profiler.to_frame().itertuples():
+        rows.append({
+            "scale": label,
+            "edges": num_edges,
+            "stage": stage.stage,
+            "seconds": stage.wall_seconds,
+            "rows_per_second": stage.rows / stage.wall_seconds,
+            "peak_rss_mb": stage.peak_rss_delta / 2**20,
+        })
+        print(f"{stage.stage:>18} {stage.wall_seconds:9.3f}s "
+              f"{rows[-1]['rows_per_second'] / 1e6:9.2f}M rows/s "
+              f"{rows[-1]['peak_rss_mb']:9.1f} MB", flush=True)
+
+results = pd.DataFrame(rows)
+if args.output:
+    results.to_csv(args.output, index=False)
+
+stages = list(dict.fromkeys(results["stage"]))
+seconds = results.pivot(index="stage", columns="scale", values="seconds").reindex(stages)
+throughput = results.pivot(index="stage", columns="scale", values="rows_per_second").reindex(stages)
+scales = args.scales.split(",")
+print("\nSeconds per stage")
+print(seconds[scales].to_string(float_format="{:.3f}".format))
+print("\nMillion rows (or edges) per second")
+print((throughput[scales] / 1e6).to_string(float_format="{:.2f}".format))
+
+if len(scales) > 1:
+    print("\nScaling exponent (seconds ~ edges ** exponent)")
+    for name, group in results.groupby("stage", sort=False):
+        if len(group) > 1:
+            exponent = np.polyfit(np.log(group["edges"]), np.log(group["seconds"]), 1)[0]
+            print(f"{name:>18} {exponent:.2f}")
@@ -0,0 +1,69 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+#
+# Measure how the PageRank and HITS kernels scale with the number of threads:
+# python bench_spmv_scaling.py [edgelist_csv] [--max-workers N] [--iterations K]
+#
+# Each run does a fixed number of iterations (tol=0 so the solvers never stop
+# early). The median time per iteration excludes setup such as building the
+# row blocks, and the speedup is reported relative to the single-threaded run.
+#
+import argparse
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from wikigraph import CSRGraph, ConvergenceLog, hits_arrays, load_edge_arrays, pagerank_array
+from wikigraph.parallel import default_workers
+
+
+def time_kernel(kernel, G, workers, iterations):
+    """Return the median seconds per iteration, excluding setup."""
+    log = ConvergenceLog()
+    try:
+        kernel(G, max_iter=iterations, tol=0, workers=workers, telemetry=log)
+    except nx.PowerIterationFailedConvergence:
+        pass  # expected with tol=0
+    return float(np.median(log.seconds))
+
+
+def worker_counts(max_workers):
+    counts = []
+    w = 1
+    while w < max_workers:
+        counts.append(w)
+        w *= 2
+    counts.append(max_workers)
+    return counts
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("edgelist_csv", nargs="?", default="enwiki-20240620-edges_2.csv")
+parser.add_argument("--max-workers", type=int, default=default_workers())
+parser.add_argument("--iterations", type=int, default=10)
+args = parser.parse_args()
+
+print(f"Loading {args.edgelist_csv}...", flush=True)
+src, dst = load_edge_arrays(args.edgelist_csv)
+G = CSRGraph.from_edgelist(src, dst)
+G.reverse()  # build the cached reverse graph outside of the timed runs
+print(f"{G}, {len(G)} nodes with edges", flush=True)
+
+rows = []
+for name, kernel in [("pagerank", pagerank_array), ("hits", hits_arrays)]:
+    baseline = None
+    for workers in worker_counts(args.max_workers):
+        seconds = time_kernel(kernel, G, workers, args.iterations)
+        baseline = baseline or seconds
+        rows.append({
+            "kernel": name,
+            "workers": workers,
+            "seconds_per_iteration": seconds,
+            "edges_per_second": G.num_edges / seconds,
+            "speedup": baseline / seconds,
+        })
+        print(f"{name:>8} workers={workers:<3d} {seconds:.4f}s/iteration "
+              f"speedup={baseline / seconds:.2f}x", flush=True)
+
+print()
+print(pd.DataFrame(rows).to_string(index=False))
@@ -6,12 +6,17 @@
 # Enable nx-cugraph:
 # NETWORKX_BACKEND_PRIORITY="cugraph" python demo5.py
 #
+import functools
 import os
-import time
-from datetime import timedelta
 
-import pandas as pd
 import networkx as nx
+import pandas as pd
+
+from wikigraph import (
+    Pipeline, dict_to_array, editor_bot_flags, influence_frame, load_edgelist, load_revisions,
+    load_title_index, stream_editor_totals,
+)
+from wikigraph.profiling import Profiler
 
 # If this script runs out of memory because your GPU is too small, try uncommenting
 # these lines and try again. This enables the usage of CUDA managed memory and turns on
@@ -20,26 +25,7 @@ import networkx as nx
 # rmm.reinitialize(pool_allocator=True, managed_memory=True)
 
 
-class Timer:
-    session_total = 0
-
-    def __init__(self, start_msg=""):
-        self.st = 0
-        self.start_msg = start_msg
-
-    def __enter__(self):
-        if self.start_msg:
-            print(f"\n{self.start_msg}...")
-        self.st = time.perf_counter()
-
-    def __exit__(self, exc_type, exc_value, traceback):
-        runtime = time.perf_counter() - self.st
-        Timer.session_total += runtime
-        print(f"Done in: {timedelta(seconds=runtime)}")
-
-    @classmethod
-    def print_total(cls):
-        print(f"Total time: {timedelta(seconds=cls.session_total)}")
+profiler = Profiler()
 
 
 nx.config.cache_converted_graphs = True  # This is the default in NX 3.4
@@ -49,63 +35,86 @@ nx.config.cache_converted_graphs = True  # This is the default in NX 3.4
 edgelist_csv = "full_graph.csv"
 nodedata_csv = "full_data.csv"
 revisions_csv = "halved_revisions.csv"
-
-with Timer(f"Read the Wikipedia revision history from {revisions_csv}"):
-    revisions_df = pd.read_csv(
-        revisions_csv,
-        sep="\t",
-        names=["title", "editor"],
-        dtype="str",
-    )
-
-with Timer(f"Read the Wikipedia page metadata from {nodedata_csv}"):
-    nodedata_df = pd.read_csv(
-        nodedata_csv,
-        sep="\t",
-        names=["nodeid", "title"],
-        dtype={"nodeid": "int32", "title": "str"},
-    )
-
-with Timer(f"Connect page editors to the page ids"):
-    node_revisions_df = nodedata_df.merge(revisions_df, on="title")
-
-with Timer(f"Read the Wikipedia connectivity information from {edgelist_csv}"):
-    edgelist_df = pd.read_csv(
-        edgelist_csv,
-        sep=" ",
-        names=["src", "dst"],
-        dtype="int32",
+# Set to a number of bytes (e.g. 4 << 30) to stream the revisions in chunks within
+# that memory budget instead of loading them, for a full history larger than memory.
+revisions_memory_budget = None
+# Where the results of the pipeline stages are stored; None reruns every stage.
+stage_cache_dir = "demo.stages"
+
+with profiler.stage(f"Load the title <-> nodeid index for {nodedata_csv}"):
+    # Only parses the CSV the first time, see wikigraph/titleindex.py
+    title_index = load_title_index(nodedata_csv)
+
+if revisions_memory_budget is None:
+    with profiler.stage(f"Read the Wikipedia revision history from {revisions_csv}") as stage:
+        # Parsed once into int32 editor codes and title codes, see
+        # wikigraph/revisions.py. The titles are connected to the page ids here.
+        revisions = load_revisions(revisions_csv, title_index)
+        stage.rows = len(revisions)
+
+with profiler.stage(f"Read the Wikipedia connectivity information from {edgelist_csv}") as stage:
+    # Parsed once into a memory-mapped binary cache next to the CSV, see
+    # wikigraph/edgecache.py
+    edgelist_df = load_edgelist(edgelist_csv)
+    stage.rows = len(edgelist_df)
+
+
+# The stages below only run when their inputs changed; otherwise their results
+# are loaded from stage_cache_dir, see wikigraph/pipeline.py.
+pipeline = Pipeline(stage_cache_dir, profiler)
+
+
+@functools.cache
+def networkx_graph():
+    with profiler.stage(f"Create a NetworkX graph from the connectivity info"):
+        return nx.from_pandas_edgelist(
+            edgelist_df,
+            source="src",
+            target="dst",
+            create_using=nx.DiGraph,
+        )
+
+
+def run_pagerank(edgelist_csv, alpha, tol):
+    G = networkx_graph()
+    nx_pr_vals = nx.pagerank(G, alpha=alpha, tol=tol)
+    if os.environ.get("NETWORKX_BACKEND_PRIORITY") is not None:
+        with profiler.stage(f"Run again using the cached graph conversion"):
+            nx.pagerank(G, alpha=alpha, tol=tol, backend="cugraph")
+    with profiler.stage(f"Create an array containing PageRank values"):
+        return dict_to_array(nx_pr_vals)
+
+
+def sum_by_editor(revisions_csv, nodedata_csv, pagerank):
+    # A bincount of the PageRank of each revised page over the editor codes
+    sums, counts = revisions.editor_totals(pagerank)
+    return {"sums": sums, "counts": counts}
+
+
+pagerank = pipeline.run(
+    "pagerank", run_pagerank, files={"edgelist_csv": edgelist_csv},
+    params={"alpha": 0.85, "tol": 1e-06}, message="Run NetworkX pagerank",
+)
+
+if revisions_memory_budget is None:
+    totals = pipeline.run(
+        "editor totals", sum_by_editor,
+        files={"revisions_csv": revisions_csv, "nodedata_csv": nodedata_csv},
+        stages={"pagerank": "pagerank"}, message="Compute the most influential editors",
     )
-
-with Timer(f"Create a NetworkX graph from the connectivity info"):
-    G = nx.from_pandas_edgelist(
-        edgelist_df,
-        source="src",
-        target="dst",
-        create_using=nx.DiGraph,
-    )
-
-with Timer(f"Run NetworkX pagerank"):
-    nx_pr_vals = nx.pagerank(G)
-
-if os.environ.get("NETWORKX_BACKEND_PRIORITY") is not None:
-    with Timer(f"Run again using the cached graph conversion"):
-        nx.pagerank(G, backend="cugraph")
-
-with Timer(f"Create a DataFrame containing PageRank values"):
-    pagerank_df = pd.DataFrame({
-        "nodeid": nx_pr_vals.keys(),
-        "pagerank": nx_pr_vals.values()
-    })
-
-with Timer(f"Merge the PageRank scores onto the per-page information"):
-    final_df = node_revisions_df.merge(pagerank_df, on="nodeid").drop("nodeid", axis=1)
-
-with Timer(f"Compute the most influential editors"):
-    influence = final_df[['editor', 'pagerank']].groupby("editor").sum().reset_index()
-
-with Timer(f"Show the most influential human editors"):
-    most_influential_human = influence[~influence["editor"].str.lower().str.contains("bot")]
+    editors = revisions.editors
+    influence = totals["sums"], totals["counts"]
+    # Bots are flagged once per editor and cached, see wikigraph/bots.py
+    bots = revisions.bot_mask()
+else:
+    with profiler.stage(f"Compute the most influential editors"):
+        editors, influence = stream_editor_totals(
+            revisions_csv, title_index, pagerank, memory_budget=revisions_memory_budget
+        )
+        bots = editor_bot_flags(editors)
+
+with profiler.stage(f"Show the most influential human editors"):
+    most_influential_human = influence_frame(editors, influence, editor_mask=~bots)
     print(most_influential_human.sort_values(by="pagerank").tail(10))
 
 
@@ -116,16 +125,30 @@ other_articles = [
     "Kevin Bacon",
 ]
 
-with Timer(f"Find the nodeids for articles in the nodedata"):
-    scipy_nodeid = nodedata_df.loc[nodedata_df["title"] == "SciPy"]["nodeid"].values[0]
-    other_nodeids = {t: nodedata_df.loc[nodedata_df["title"] == t]["nodeid"].values[0]
-                     for t in other_articles}
+with profiler.stage(f"Find the nodeids for articles in the title index"):
+    scipy_nodeid = title_index.nodeid("SciPy")
+    other_nodeids = dict(zip(other_articles, title_index.lookup(other_articles).tolist()))
+
+
+def find_shortest_paths(edgelist_csv, source, targets):
+    nx_shortest_paths = nx.shortest_path(networkx_graph(), source=source)
+    return pd.DataFrame(
+        [(target, nodeid) for target in targets for nodeid in nx_shortest_paths[target]],
+        columns=["target", "nodeid"],
+    )
+
 
-with Timer(f"Find the shortest path between the SciPy article and all articles"):
-    nx_shortest_paths = nx.shortest_path(G, source=scipy_nodeid)
+shortest_paths = pipeline.run(
+    "shortest paths", find_shortest_paths, files={"edgelist_csv": edgelist_csv},
+    params={"source": scipy_nodeid, "targets": list(other_nodeids.values())},
+    message="Find the shortest path between the SciPy article and all articles",
+)
 
-with Timer("Print the shortest paths"):
+with profiler.stage("Print the shortest paths"):
     for p in other_nodeids:
         print(f"\nFind the shortest path between SciPy and {p}...")
-        for nodeid in nx_shortest_paths[other_nodeids[p]]:
-            print(f'{nodedata_df.loc[nodedata_df["nodeid"] == nodeid]["title"].values[0]}')
+        path = shortest_paths["nodeid"][shortest_paths["target"] == other_nodeids[p]]
+        for title in title_index.titles(path):
+            print(title)
+
+profiler.finish()
@@ -0,0 +1,99 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+#
+# CPU-only variant of demo_wikipedia_pagerank.py and the "Six Degrees of SciPy"
+# part of demo.py that skips building a NetworkX graph and runs on a CSR
+# adjacency built directly from the edge list columns:
+# python demo_cpu_csr.py
+#
+# The CSR graph, PageRank and BFS results are kept in a persistent cache (see
+# wikigraph/graphcache.py), so later runs load them instead of recomputing.
+#
+import numpy as np
+
+from wikigraph import (
+    BidirectionalBFS, ConvergenceLog, GraphCache, load_namespaces, load_nodetable,
+    load_title_index, namespace_mask, node_column, pagerank_array,
+)
+from wikigraph.profiling import Profiler
+
+
+profiler = Profiler()
+cache = GraphCache()
+
+
+edgelist_csv = "enwiki-20240620-edges_2.csv"
+nodedata_csv = "enwiki-20240620-nodeids_2_2.csv"
+
+with profiler.stage(f"Read the wikipedia page metadata from {nodedata_csv}"):
+    nodedata_df = load_nodetable(nodedata_csv)
+
+with profiler.stage(f"Create a CSR graph from the connectivity info in {edgelist_csv}") as stage:
+    G = cache.graph(edgelist_csv)
+    stage.rows = G.num_edges
+
+with profiler.stage(f"Run pagerank on the CSR graph") as stage:
+    pr_log = ConvergenceLog(verbose=True)
+    pr_vals = cache.pagerank(edgelist_csv, telemetry=pr_log)
+    stage.rows = G.num_edges * len(pr_log.seconds)
+# No iterations are recorded when the result is loaded from the cache
+if pr_log.iterations:
+    print(pr_log)
+
+with profiler.stage(f"Add pagerank results to nodedata as new columns"):
+    nodedata_df["pagerank"] = node_column(pr_vals, nodedata_df.index, G.node_mask)
+
+with profiler.stage(f"Show the top 25 pages based on pagerank value"):
+    print(nodedata_df.sort_values(by="pagerank", ascending=False).head(25))
+
+print(f"\nNumber of links: {G.num_edges}")
+with profiler.stage(f"Remove pages not in the main namespace"):
+    namespace = load_namespaces(nodedata_csv, nodedata_df)
+    articles, article_ids = G.subgraph(namespace_mask(namespace, num_nodes=G.num_nodes))
+print(f"Number of links: {articles.num_edges}")
+
+with profiler.stage(f"Rerun pagerank from the previous result until the top 25 is stable"):
+    article_log = ConvergenceLog()
+    article_pr = pagerank_array(articles, nstart=pr_vals[article_ids], top_k=25,
+                                telemetry=article_log)
+print(article_log)
+
+with profiler.stage(f"Show the top 25 main namespace pages based on pagerank value"):
+    article_pr_vals = np.full(G.num_nodes, np.nan)
+    article_pr_vals[article_ids] = article_pr
+    nodedata_df["article_pagerank"] = node_column(article_pr_vals, nodedata_df.index)
+    print(nodedata_df.sort_values(by="article_pagerank", ascending=False).head(25))
+
+
+# Six Degrees of SciPy
+other_articles = [
+    "Orange juice",
+    "Lake Leon (Florida)",
+    "Kevin Bacon",
+]
+
+with profiler.stage(f"Find the nodeids for articles in the title index"):
+    title_index = load_title_index(nodedata_csv, nodedata_df)
+    scipy_nodeid = title_index.nodeid("SciPy")
+    other_nodeids = dict(zip(other_articles, title_index.lookup(other_articles).tolist()))
+
+with profiler.stage(f"Find the shortest paths between the SciPy article and the other articles"):
+    six_degrees = BidirectionalBFS(G).paths(
+        (scipy_nodeid, nodeid) for nodeid in other_nodeids.values()
+    )
+
+with profiler.stage("Print the shortest paths"):
+    for p in other_nodeids:
+        print(f"\nFind the shortest path between SciPy and {p}...")
+        for title in title_index.titles(six_degrees[(scipy_nodeid, other_nodeids[p])]):
+            print(title)
+
+with profiler.stage(f"Find the distance from the SciPy article to all articles"):
+    scipy_bfs = cache.bfs(edgelist_csv, scipy_nodeid)
+
+with profiler.stage(f"Add hops from the SciPy article to nodedata as a new column"):
+    nodedata_df["hops_from_scipy"] = node_column(scipy_bfs.distance, nodedata_df.index, fill=-1)
+
+with profiler.stage(f"Show the number of pages at each distance from the SciPy article"):
+    print(nodedata_df["hops_from_scipy"].value_counts().sort_index())
+
+profiler.finish()
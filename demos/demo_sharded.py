@@ -0,0 +1,62 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+#
+# Out-of-core variant of demo_cpu_csr.py for edge lists larger than memory:
+# python demo_sharded.py
+#
+# The graph is split once into source-range shards next to the edge list (see
+# wikigraph/shards.py), and PageRank, HITS and BFS stream over the shards, so
+# only the per-node vectors and one shard need to fit in memory_budget.
+#
+from wikigraph import (
+    ConvergenceLog, load_nodetable, load_sharded_graph, load_title_index, node_column,
+    sharded_bfs, sharded_hits, sharded_pagerank,
+)
+from wikigraph.profiling import Profiler
+
+
+profiler = Profiler()
+
+
+edgelist_csv = "enwiki-20240620-edges_2.csv"
+nodedata_csv = "enwiki-20240620-nodeids_2_2.csv"
+# Bytes for the per-node vectors plus one shard; also picks the shard size
+memory_budget = 4 << 30
+
+with profiler.stage(f"Load the sharded graph of {edgelist_csv}") as stage:
+    G = load_sharded_graph(edgelist_csv, memory_budget=memory_budget)
+    stage.rows = G.num_edges
+print(G)
+
+with profiler.stage(f"Read the wikipedia page metadata from {nodedata_csv}"):
+    nodedata_df = load_nodetable(nodedata_csv)
+
+with profiler.stage(f"Run pagerank over the shards") as stage:
+    pr_log = ConvergenceLog(verbose=True)
+    pr_vals = sharded_pagerank(G, telemetry=pr_log)
+    stage.rows = G.num_edges * pr_log.iterations
+print(pr_log)
+
+with profiler.stage(f"Run HITS over the shards") as stage:
+    hits_log = ConvergenceLog()
+    hubs, authorities = sharded_hits(G, telemetry=hits_log)
+    stage.rows = G.num_edges * hits_log.iterations
+print(hits_log)
+
+with profiler.stage(f"Add pagerank and authority results to nodedata as new columns"):
+    nodedata_df["pagerank"] = node_column(pr_vals, nodedata_df.index, G.node_mask)
+    nodedata_df["authority"] = node_column(authorities, nodedata_df.index, G.node_mask)
+
+with profiler.stage(f"Show the top 25 pages based on pagerank value"):
+    print(nodedata_df.sort_values(by="pagerank", ascending=False).head(25))
+
+with profiler.stage(f"Find the distance from the SciPy article to all articles"):
+    title_index = load_title_index(nodedata_csv, nodedata_df)
+    scipy_bfs = sharded_bfs(G, title_index.nodeid("SciPy"))
+
+with profiler.stage(f"Add hops from the SciPy article to nodedata as a new column"):
+    nodedata_df["hops_from_scipy"] = node_column(scipy_bfs.distance, nodedata_df.index, fill=-1)
+
+with profiler.stage(f"Show the number of pages at each distance from the SciPy article"):
+    print(nodedata_df["hops_from_scipy"].value_counts().sort_index())
+
+profiler.finish()
@@ -4,33 +4,15 @@
 # NETWORKX_BACKEND_PRIORITY="cugraph" python -m cudf.pandas demo_wikipedia_pagerank.py
 #
 import os
-import time
-from datetime import timedelta
 
 import pandas as pd
 import networkx as nx
 
+from wikigraph import dict_to_array, load_edgelist, node_column
+from wikigraph.profiling import Profiler
 
-class Timer:
-    session_total = 0
 
-    def __init__(self, start_msg=""):
-        self.st = 0
-        self.start_msg = start_msg
-
-    def __enter__(self):
-        if self.start_msg:
-            print(f"\n{self.start_msg}...", flush=True)
-        self.st = time.perf_counter()
-
-    def __exit__(self, exc_type, exc_value, traceback):
-        runtime = time.perf_counter() - self.st
-        Timer.session_total += runtime
-        print(f"Done in: {timedelta(seconds=runtime)}", flush=True)
-
-    @classmethod
-    def print_total(cls):
-        print(f"Total time: {timedelta(seconds=cls.session_total)}", flush=True)
+profiler = Profiler()
 
 
 if os.environ.get("NETWORKX_BACKEND_PRIORITY") == "cugraph":
@@ -41,15 +23,13 @@ if os.environ.get("NETWORKX_BACKEND_PRIORITY") == "cugraph":
 edgelist_csv = "enwiki-20240620-edges_2.csv"
 nodedata_csv = "enwiki-20240620-nodeids_2_2.csv"
 
-with Timer(f"Read the wikipedia connectivity information from {edgelist_csv}"):
-    edgelist_df = pd.read_csv(
-        edgelist_csv,
-        sep=" ",
-        names=["src", "dst"],
-        dtype="int32",
-    )
+with profiler.stage(f"Read the wikipedia connectivity information from {edgelist_csv}") as stage:
+    # Parsed once into a memory-mapped binary cache next to the CSV, see
+    # wikigraph/edgecache.py
+    edgelist_df = load_edgelist(edgelist_csv)
+    stage.rows = len(edgelist_df)
 
-with Timer(f"Read the wikipedia page metadata from {nodedata_csv}"):
+with profiler.stage(f"Read the wikipedia page metadata from {nodedata_csv}"):
     nodedata_df = pd.read_csv(
         nodedata_csv,
         sep="\t",
@@ -57,7 +37,7 @@ with Timer(f"Read the wikipedia page metadata from {nodedata_csv}"):
         dtype={"nodeid": "int32", "title": "str"},
     )
 
-with Timer(f"Create a NetworkX graph from the connectivity info"):
+with profiler.stage(f"Create a NetworkX graph from the connectivity info"):
     G = nx.from_pandas_edgelist(
         edgelist_df,
         source="src",
@@ -65,19 +45,16 @@ with Timer(f"Create a NetworkX graph from the connectivity info"):
         create_using=nx.DiGraph,
     )
 
-with Timer(f"Run NetworkX pagerank"):
+with profiler.stage(f"Run NetworkX pagerank"):
     nx_pr_vals = nx.pagerank(G)
 
-with Timer(f"Create a DataFrame containing NetworkX results"):
-    pagerank_df = pd.DataFrame({
-        "nodeid": nx_pr_vals.keys(),
-        "pagerank": nx_pr_vals.values()
-    })
+with profiler.stage(f"Create an array containing NetworkX results"):
+    pagerank = dict_to_array(nx_pr_vals)
 
-with Timer(f"Add NetworkX results to nodedata as new columns"):
-    nodedata_df = nodedata_df.merge(pagerank_df, how="left", on="nodeid")
+with profiler.stage(f"Add NetworkX results to nodedata as new columns"):
+    nodedata_df["pagerank"] = node_column(pagerank, nodedata_df["nodeid"])
 
-with Timer(f"Show the top 25 pages based on pagerank value"):
+with profiler.stage(f"Show the top 25 pages based on pagerank value"):
     print(nodedata_df.sort_values(by="pagerank", ascending=False).head(25))
 
-Timer.print_total()
+profiler.finish()
@@ -0,0 +1,25 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""CPU-side helpers for the Wikipedia graph demos."""
+from .edgecache import load_edge_arrays, load_edgelist, convert_edgelist
+from .edgewriter import write_edgelist
+from .csr import CSRGraph
+from .algorithms import pagerank, hits, shortest_path
+from .pagerank import ConvergenceLog, pagerank_array
+from .hits import hits_arrays
+from .parallel import RowBlockMatrix
+from .bfs import (
+    BFSResult, BidirectionalBFS, MultiSourceBFSResult, bfs, bidirectional_shortest_path,
+    multi_source_bfs,
+)
+from .frames import dict_to_array, node_column, results_frame
+from .nodetable import dense_nodetable, load_nodetable
+from .titleindex import TitleIndex, load_title_index
+from .stringtable import StringTable
+from .namespaces import load_namespaces, namespace_codes, namespace_mask
+from .bots import BotRules, editor_bot_flags, is_bot
+from .revisions import Revisions, influence_frame, load_revisions, stream_editor_totals
+from .pipeline import Pipeline
+from .graphcache import GraphCache, edgelist_fingerprint
+from .shards import (
+    ShardedGraph, load_sharded_graph, sharded_bfs, sharded_hits, sharded_pagerank,
+)
@@ -0,0 +1,67 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""NetworkX-compatible algorithms that run on a CSRGraph.
+
+These take the same arguments as their NetworkX counterparts and return the
+same dict-based results, so a script can swap
+
+    G = nx.from_pandas_edgelist(edgelist_df, "src", "dst", create_using=nx.DiGraph)
+    pr = nx.pagerank(G)
+
+for
+
+    G = CSRGraph.from_pandas_edgelist(edgelist_df)
+    pr = wikigraph.pagerank(G)
+
+without changing the code that consumes the results.
+"""
+from .bfs import bfs, bidirectional_shortest_path
+from .hits import hits_arrays
+from .pagerank import pagerank_array
+
+
+def _to_dict(G, values):
+    nodes = G.nodes()
+    return dict(zip(nodes.tolist(), values[nodes].tolist()))
+
+
+def pagerank(G, alpha=0.85, personalization=None, max_iter=100, tol=1.0e-6,
+             nstart=None, weight="weight", dangling=None, workers=1, top_k=None,
+             patience=3):
+    """Return the PageRank of the nodes of a CSRGraph, like nx.pagerank().
+
+    CSRGraph edges are unweighted, so weight is accepted only for signature
+    compatibility. See pagerank_array() for the array-returning version and
+    for top_k and patience.
+    """
+    x = pagerank_array(G, alpha=alpha, personalization=personalization,
+                       max_iter=max_iter, tol=tol, nstart=nstart, dangling=dangling,
+                       workers=workers, top_k=top_k, patience=patience)
+    return _to_dict(G, x)
+
+
+def hits(G, max_iter=100, tol=1.0e-8, nstart=None, normalized=True, workers=1,
+         top_k=None, patience=3):
+    """Return the HITS hubs and authorities of a CSRGraph, like nx.hits().
+
+    See hits_arrays() for the array-returning version and for top_k and
+    patience.
+    """
+    if len(G) == 0:
+        return {}, {}
+    h, a = hits_arrays(G, max_iter=max_iter, tol=tol, nstart=nstart,
+                       normalized=normalized, workers=workers, top_k=top_k,
+                       patience=patience)
+    return _to_dict(G, h), _to_dict(G, a)
+
+
+def shortest_path(G, source, target=None):
+    """Return unweighted shortest paths from source, like nx.shortest_path().
+
+    With a target, returns the path as a list of node ids. Without one, returns
+    a dict mapping every reachable node to its path from source. Use bfs()
+    directly to get compact distance and predecessor arrays instead.
+    """
+    if target is not None:
+        return bidirectional_shortest_path(G, source, target)
+    result = bfs(G, source)
+    return result.paths(result.reachable())
@@ -0,0 +1,349 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Breadth-first search returning compact arrays.
+
+nx.shortest_path(G, source) returns a dict holding a full Python list path for
+every reachable node, which is O(N * depth) memory for the Wikipedia graph.
+bfs() instead returns two int32 arrays indexed by node id, distance and
+predecessor, and paths are only reconstructed for the targets that are
+actually asked for:
+
+    result = bfs(G, scipy_nodeid)
+    nodedata_df["hops_from_scipy"] = result.distance
+    print(result.path(orange_juice_nodeid))
+
+multi_source_bfs() runs many such searches together, one bit per source, so
+that the edges shared by their traversals are read once per level instead of
+once per source.
+"""
+import networkx as nx
+import numpy as np
+
+# Above this fraction of all nodes, the next frontier is found by scanning the
+# distance array instead of sorting the discovered nodes.
+_SCAN_FRACTION = 1 / 64
+
+
+def frontier_edges(G, frontier):
+    """Return (parents, neighbors) for every out-edge of the nodes in frontier.
+
+    The edge positions are computed for the whole frontier at once, so there
+    is no per-node Python loop.
+    """
+    starts = G.indptr[frontier]
+    counts = G.indptr[frontier + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=G.indices.dtype)
+        return empty, empty
+    # offsets[i] for the j-th edge of frontier[k] is starts[k] + j
+    first = np.cumsum(counts) - counts
+    offsets = np.repeat(starts - first, counts) + np.arange(total)
+    return np.repeat(frontier, counts), G.indices[offsets]
+
+
+class BFSResult:
+    """Distances and predecessors from one BFS source.
+
+    distance[n] is the number of hops from source to n, or -1 if n is not
+    reachable. predecessor[n] is the node before n on one shortest path from
+    source, or -1 for the source itself and for unreachable nodes.
+    """
+
+    def __init__(self, source, distance, predecessor):
+        self.source = source
+        self.distance = distance
+        self.predecessor = predecessor
+
+    def reachable(self):
+        """Return the ids of all nodes reachable from the source."""
+        return np.flatnonzero(self.distance >= 0)
+
+    def path(self, target):
+        """Return the shortest path from the source to target as a list of ids."""
+        if not 0 <= target < len(self.distance) or self.distance[target] < 0:
+            raise nx.NetworkXNoPath(f"Target {target} cannot be reached from {self.source}")
+        path = [int(target)]
+        while path[-1] != self.source:
+            path.append(int(self.predecessor[path[-1]]))
+        path.reverse()
+        return path
+
+    def paths(self, targets):
+        """Return {target: path} for the given targets (unreachable ones are skipped)."""
+        return {int(t): self.path(t) for t in targets
+                if 0 <= t < len(self.distance) and self.distance[t] >= 0}
+
+
+def bfs(G, source):
+    """Run a level-synchronous BFS over a CSRGraph from source.
+
+    Each level expands the whole frontier at once with NumPy, so there is no
+    per-edge Python work and memory use is two int32 arrays plus the largest
+    frontier's edges.
+    """
+    if not G.has_node(source):
+        raise nx.NodeNotFound(f"Source {source} is not in G")
+    num_nodes = G.num_nodes
+    distance = np.full(num_nodes, -1, dtype=np.int32)
+    predecessor = np.full(num_nodes, -1, dtype=np.int32)
+    distance[source] = 0
+    frontier = np.array([source], dtype=np.int32)
+    level = 0
+    while len(frontier):
+        level += 1
+        parents, nbrs = frontier_edges(G, frontier)
+        unvisited = distance[nbrs] == -1
+        nbrs = nbrs[unvisited]
+        # Any parent of a node discovered in this level is on a shortest path,
+        # so it does not matter which of the duplicate writes wins.
+        predecessor[nbrs] = parents[unvisited]
+        distance[nbrs] = level
+        if len(nbrs) > num_nodes * _SCAN_FRACTION:
+            frontier = np.flatnonzero(distance == level).astype(np.int32)
+        else:
+            frontier = np.unique(nbrs)
+    return BFSResult(source, distance, predecessor)
+
+
+class BidirectionalBFS:
+    """Point-to-point shortest paths by searching from both ends.
+
+    The forward search follows out-edges from the source and the backward
+    search follows in-edges (the reversed graph) from the target, always
+    expanding the side whose frontier has fewer edges, until the two meet.
+    For the "six degrees" style queries this touches a tiny part of the graph
+    compared to a full single-source BFS.
+
+    The visited buffers are allocated once per instance and only the entries
+    touched by a query are reset afterwards, so a batch of queries does not
+    pay O(num_nodes) per query:
+
+        searcher = BidirectionalBFS(G)
+        paths = searcher.paths([(scipy, orange_juice), (scipy, kevin_bacon)])
+    """
+
+    _UNSEEN = -2
+    _ROOT = -1
+
+    def __init__(self, G):
+        self.G = G
+        self.R = G.reverse()
+        self._out_degree = G.out_degree()
+        self._in_degree = self.R.out_degree()
+        self._fwd = np.full(G.num_nodes, self._UNSEEN, dtype=np.int32)
+        self._bwd = np.full(G.num_nodes, self._UNSEEN, dtype=np.int32)
+        self._touched_fwd = []
+        self._touched_bwd = []
+
+    def _expand(self, graph, frontier, parents_of, touched):
+        parents, nbrs = frontier_edges(graph, frontier)
+        unseen = parents_of[nbrs] == self._UNSEEN
+        nbrs = nbrs[unseen]
+        parents_of[nbrs] = parents[unseen]
+        frontier = np.unique(nbrs)
+        touched.append(frontier)
+        return frontier
+
+    def _search(self, source, target):
+        """Return a node where the two searches meet, or None."""
+        fwd, bwd = self._fwd, self._bwd
+        ffront = np.array([source], dtype=np.int32)
+        bfront = np.array([target], dtype=np.int32)
+        fwd[ffront] = self._ROOT
+        bwd[bfront] = self._ROOT
+        self._touched_fwd.append(ffront)
+        self._touched_bwd.append(bfront)
+        if source == target:
+            return source
+        while len(ffront) and len(bfront):
+            if self._out_degree[ffront].sum() <= self._in_degree[bfront].sum():
+                ffront = self._expand(self.G, ffront, fwd, self._touched_fwd)
+                meet = ffront[bwd[ffront] != self._UNSEEN]
+            else:
+                bfront = self._expand(self.R, bfront, bwd, self._touched_bwd)
+                meet = bfront[fwd[bfront] != self._UNSEEN]
+            # Every node found in the first level that meets the other side is
+            # on a shortest path, so any one of them will do.
+            if len(meet):
+                return int(meet[0])
+        return None
+
+    def _path_through(self, meet):
+        path = [meet]
+        while self._fwd[path[-1]] != self._ROOT:
+            path.append(int(self._fwd[path[-1]]))
+        path.reverse()
+        while self._bwd[path[-1]] != self._ROOT:
+            path.append(int(self._bwd[path[-1]]))
+        return path
+
+    def _reset(self):
+        for buffer, touched in ((self._fwd, self._touched_fwd), (self._bwd, self._touched_bwd)):
+            for nodes in touched:
+                buffer[nodes] = self._UNSEEN
+            touched.clear()
+
+    def path(self, source, target):
+        """Return a shortest path from source to target as a list of node ids."""
+        for n, kind in ((source, "Source"), (target, "Target")):
+            if not self.G.has_node(n):
+                raise nx.NodeNotFound(f"{kind} {n} is not in G")
+        try:
+            meet = self._search(source, target)
+            if meet is None:
+                raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
+            return self._path_through(meet)
+        finally:
+            self._reset()
+
+    def paths(self, pairs):
+        """Return {(source, target): path} for a batch of pairs.
+
+        The path is None for pairs with no path between them.
+        """
+        result = {}
+        for source, target in pairs:
+            key = (int(source), int(target))
+            try:
+                result[key] = self.path(*key)
+            except nx.NetworkXNoPath:
+                result[key] = None
+        return result
+
+
+def bidirectional_shortest_path(G, source, target):
+    """Return a shortest path from source to target, like nx.bidirectional_shortest_path()."""
+    return BidirectionalBFS(G).path(source, target)
+
+
+# Sources are traversed together in groups of up to this many, one bit each.
+BATCH_SOURCES = 64
+# Little-endian, so that bit i of a bitset is bit i % 8 of byte i // 8
+_BITSET_DTYPE = np.dtype("<u8")
+# Bitsets are expanded to one byte per source this many at a time
+_UNPACK_CHUNK = 1 << 20
+
+
+class MultiSourceBFSResult:
+    """Distances (and optionally predecessors) from several BFS sources.
+
+    distance[i, n] is the number of hops from sources[i] to n, or -1 if n is
+    not reachable from it. predecessor, if computed, has the same layout and
+    meaning as BFSResult.predecessor for each source.
+    """
+
+    def __init__(self, sources, distance, predecessor=None):
+        self.sources = sources
+        self.distance = distance
+        self.predecessor = predecessor
+
+    def __len__(self):
+        return len(self.sources)
+
+    def result(self, i):
+        """Return the BFSResult of the i-th source (views, not copies)."""
+        if self.predecessor is None:
+            raise ValueError("predecessors were not computed, use return_predecessors=True")
+        return BFSResult(int(self.sources[i]), self.distance[i], self.predecessor[i])
+
+    def path(self, i, target):
+        """Return the shortest path from the i-th source to target."""
+        return self.result(i).path(target)
+
+
+def _unpack_bits(node_bits, num_sources):
+    """Return a (len(node_bits), num_sources) bool array of the bits of each bitset."""
+    unpacked = np.unpackbits(node_bits.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    return unpacked[:, :num_sources].view(bool)
+
+
+def _set_level(distance, reached, reached_bits, level):
+    """Set distance[i, reached[j]] = level for every bit i set in reached_bits[j].
+
+    reached holds no duplicates, so the columns can be updated as dense blocks,
+    which is much faster than scattering one entry per set bit.
+    """
+    for start in range(0, len(reached), _UNPACK_CHUNK):
+        stop = start + _UNPACK_CHUNK
+        columns = reached[start:stop]
+        block = distance[:, columns]
+        np.copyto(block, level, where=_unpack_bits(reached_bits[start:stop], len(distance)).T)
+        distance[:, columns] = block
+
+
+def _set_parents(predecessor, nbrs, edge_bits, parents):
+    """Set predecessor[i, nbrs[j]] = parents[j] for every bit i set in edge_bits[j]."""
+    for start in range(0, len(nbrs), _UNPACK_CHUNK):
+        stop = start + _UNPACK_CHUNK
+        which, source = np.nonzero(_unpack_bits(edge_bits[start:stop], len(predecessor)))
+        predecessor[source, nbrs[start:stop][which]] = parents[start:stop][which]
+
+
+def _multi_source_bfs_batch(G, sources, distance, predecessor):
+    """Traverse from up to BATCH_SOURCES sources at once, filling the given rows.
+
+    Every node carries a uint64 bitset of the sources whose frontier it is in
+    and of the sources that have visited it. Each level expands the union of
+    all frontiers once, so edges shared by several searches are read once
+    instead of once per source.
+    """
+    num_sources = len(sources)
+    bits = np.left_shift(np.uint64(1), np.arange(num_sources, dtype=_BITSET_DTYPE))
+    visited = np.zeros(G.num_nodes, dtype=_BITSET_DTYPE)
+    np.bitwise_or.at(visited, sources, bits)
+    frontier = visited.copy()
+    distance[np.arange(num_sources), sources] = 0
+    active = np.unique(sources).astype(np.int32)
+    level = 0
+    while len(active):
+        level += 1
+        parents, nbrs = frontier_edges(G, active)
+        edge_bits = frontier[parents] & ~visited[nbrs]
+        useful = edge_bits != 0
+        parents, nbrs, edge_bits = parents[useful], nbrs[useful], edge_bits[useful]
+        if len(nbrs) == 0:
+            break
+
+        # OR together the bits arriving at each newly reached node
+        order = np.argsort(nbrs, kind="stable")
+        sorted_nbrs = nbrs[order]
+        starts = np.flatnonzero(np.concatenate(([True], sorted_nbrs[1:] != sorted_nbrs[:-1])))
+        reached = sorted_nbrs[starts]
+        reached_bits = np.bitwise_or.reduceat(edge_bits[order], starts)
+
+        frontier[active] = 0
+        frontier[reached] = reached_bits
+        visited[reached] |= reached_bits
+        _set_level(distance, reached, reached_bits, level)
+        if predecessor is not None:
+            # Every parent that passed source i's bit along is on a shortest
+            # path from source i, so it does not matter which write wins.
+            _set_parents(predecessor, nbrs, edge_bits, parents)
+        active = reached
+
+
+def multi_source_bfs(G, sources, return_predecessors=False, dtype=np.int16):
+    """Run a BFS from every node in sources, sharing traversal work between them.
+
+    Sources are processed in groups of BATCH_SOURCES, each group expanding all
+    of its frontiers together with one bit per source per node. Returns a
+    MultiSourceBFSResult whose distance matrix has one row per source.
+
+    Distances are stored as dtype (int16 by default, which holds any distance
+    seen in the Wikipedia graph at half the memory of int32). Predecessors are
+    int32 and only computed with return_predecessors=True, since they take
+    len(sources) * num_nodes * 4 bytes.
+    """
+    sources = np.asarray(sources, dtype=np.int32)
+    for source in sources:
+        if not G.has_node(source):
+            raise nx.NodeNotFound(f"Source {source} is not in G")
+    distance = np.full((len(sources), G.num_nodes), -1, dtype=dtype)
+    predecessor = None
+    if return_predecessors:
+        predecessor = np.full((len(sources), G.num_nodes), -1, dtype=np.int32)
+    for start in range(0, len(sources), BATCH_SOURCES):
+        stop = start + BATCH_SOURCES
+        _multi_source_bfs_batch(G, sources[start:stop], distance[start:stop],
+                                None if predecessor is None else predecessor[start:stop])
+    return MultiSourceBFSResult(sources, distance, predecessor)
@@ -0,0 +1,127 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Rule-based bot classification of editor names.
+
+The demos tell bots from human editors with
+influence["editor"].str.lower().str.contains("bot"), which lowercases and scans
+every distinct editor on every run and also flags names like "Abbott" or
+"Robotics fan". Here the classification is a BotRules object:
+
+    patterns   regular expressions for bot names, matched anywhere in the
+               lowercased name. By default, "bot" not followed by another
+               letter, as in "ClueBot NG", "Cydebot", "Bot1058" or
+               "Citation bot" (the Wikipedia bot policy asks bot accounts to
+               have "bot" in their name).
+    case_patterns
+               regular expressions matched in the name as written. By
+               default, a leading "Bot" that starts a CamelCase name, as in
+               "BotMultichill", but not "Bottomley" or "Botswana Guy".
+    exclude    regular expressions for names that match patterns but are not
+               bots, such as the words "Abbot", "Talbot" or "Robot".
+    bots       names that are always bots, e.g. from the bot user group.
+    humans     names that are never bots.
+
+For a cached revisions table, editor_bot_flags() classifies each entry of the
+editor dictionary once and stores the flags next to it, so filtering editors
+becomes a boolean mask over editor codes:
+
+    human = ~revisions.bot_mask()
+"""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .edgecache import read_meta, write_meta
+
+BOT_PATTERNS = (r"bot(?:$|[^a-z])",)
+CASE_BOT_PATTERNS = (r"^Bot(?=[A-Z0-9_ ]|$)",)
+NOT_BOT_PATTERNS = (r"(?:^|[^a-z])(?:abbot|cabot|robot|sabot|talbot|turbot)(?:$|[^a-z])",)
+
+_FLAGS_FILE = "is_bot.npy"
+
+
+class BotRules:
+    """A configurable rule set that decides which editor names belong to bots."""
+
+    def __init__(self, patterns=BOT_PATTERNS, exclude=NOT_BOT_PATTERNS, bots=(), humans=(),
+                 case_patterns=CASE_BOT_PATTERNS):
+        self.patterns = tuple(patterns)
+        self.case_patterns = tuple(case_patterns)
+        self.exclude = tuple(exclude)
+        self.bots = frozenset(bots)
+        self.humans = frozenset(humans)
+
+    def to_dict(self):
+        """Return the rules as a JSON-compatible dict, as stored with cached flags."""
+        return {
+            "patterns": list(self.patterns),
+            "case_patterns": list(self.case_patterns),
+            "exclude": list(self.exclude),
+            "bots": sorted(self.bots),
+            "humans": sorted(self.humans),
+        }
+
+    def __eq__(self, other):
+        return isinstance(other, BotRules) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return (f"BotRules(patterns={self.patterns!r}, case_patterns={self.case_patterns!r}, "
+                f"exclude={self.exclude!r}, "
+                f"bots={len(self.bots)} names, humans={len(self.humans)} names)")
+
+    def match(self, names):
+        """Return a boolean Series flagging the bot names of a Series of editor names.
+
+        Only Series string methods are used, so names may also be a cudf
+        Series. Missing names are not bots.
+        """
+        lowered = names.str.lower()
+        flags = names.isin([])
+        if self.patterns:
+            flags = lowered.str.contains("|".join(self.patterns), regex=True).fillna(False)
+        if self.case_patterns:
+            flags |= names.str.contains("|".join(self.case_patterns), regex=True).fillna(False)
+        if self.exclude:
+            flags &= ~lowered.str.contains("|".join(self.exclude), regex=True).fillna(False)
+        if self.bots:
+            flags |= names.isin(list(self.bots))
+        if self.humans:
+            flags &= ~names.isin(list(self.humans))
+        return flags.astype(bool)
+
+
+DEFAULT_BOT_RULES = BotRules()
+
+
+def is_bot(names, rules=None):
+    """Return a boolean Series flagging bot names, by rules or DEFAULT_BOT_RULES."""
+    return (rules or DEFAULT_BOT_RULES).match(names)
+
+
+def editor_bot_flags(editors, rules=None, cache_dir=None):
+    """Return a boolean array flagging the bots among the codes of an editor dictionary.
+
+    editors is a TitleIndex of editor names <-> codes (see Revisions.editors).
+    If cache_dir is given, the flags are stored there along with the rules
+    and only recomputed when the rules or the dictionary change.
+    """
+    rules = rules or DEFAULT_BOT_RULES
+    num_editors = editors.num_nodes
+    if cache_dir is not None:
+        meta = read_meta(cache_dir)
+        if (meta is not None and meta.get("rules") == rules.to_dict()
+                and meta.get("num_editors") == num_editors):
+            return np.load(os.path.join(cache_dir, _FLAGS_FILE), mmap_mode="r")
+
+    names = pd.Series(editors.titles(np.arange(num_editors)), dtype=object)
+    flags = rules.match(names).to_numpy(dtype=bool)
+    if cache_dir is not None:
+        tmp_dir = f"{cache_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, _FLAGS_FILE), flags)
+        write_meta(tmp_dir, {"rules": rules.to_dict(), "num_editors": num_editors})
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.replace(tmp_dir, cache_dir)
+    return flags
@@ -0,0 +1,202 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Compressed sparse row (CSR) graph built directly from int32 edge columns.
+
+nx.from_pandas_edgelist() creates a dict-of-dicts with Python objects for every
+node and edge, which for the Wikipedia link graph costs tens of GB and minutes
+of wall time. CSRGraph instead stores the adjacency as two flat arrays:
+
+    indptr[u]:indptr[u + 1]   the slice of indices holding the successors of u
+    indices                   int32 successor node ids, sorted within each row
+
+Node ids are used as row numbers, so node ids must be small non-negative
+integers (the ids written by wikipedia2csv are dense, starting at 0). Ids that
+do not appear in any edge are rows with no edges and are not considered nodes
+of the graph (see node_mask), which matches what nx.from_pandas_edgelist()
+would produce.
+"""
+import numpy as np
+
+INDEX_DTYPE = np.int32
+
+
+class CSRGraph:
+    """A directed graph stored as CSR adjacency arrays.
+
+    Use CSRGraph.from_edgelist() or CSRGraph.from_pandas_edgelist() rather than
+    calling the constructor directly.
+    """
+
+    def __init__(self, indptr, indices, node_mask=None):
+        self.indptr = indptr
+        self.indices = indices
+        if node_mask is None:
+            node_mask = np.ones(len(indptr) - 1, dtype=bool)
+        self.node_mask = node_mask
+        self._reverse = None
+        self._in_degree = None
+
+    @classmethod
+    def from_edgelist(cls, src, dst, num_nodes=None):
+        """Build a graph from parallel arrays of source and destination ids.
+
+        Like nx.DiGraph, duplicate edges are collapsed into a single edge. The
+        edges are sorted as 64-bit (src, dst) keys, so peak memory is about 12
+        bytes per edge in addition to the inputs, and no per-edge Python objects
+        are created.
+        """
+        src = np.asarray(src)
+        dst = np.asarray(dst)
+        if len(src) != len(dst):
+            raise ValueError("src and dst must have the same length")
+        if num_nodes is None:
+            num_nodes = int(max(src.max(initial=-1), dst.max(initial=-1))) + 1
+        if len(src) and min(src.min(), dst.min()) < 0:
+            raise ValueError("node ids must be non-negative")
+        if num_nodes > np.iinfo(INDEX_DTYPE).max:
+            raise ValueError(f"too many nodes for {INDEX_DTYPE.__name__} ids: {num_nodes}")
+
+        keys = src.astype(np.int64)
+        keys <<= 32
+        keys |= dst.astype(np.int64)
+        keys.sort()
+        if len(keys) > 1:
+            unique = np.empty(len(keys), dtype=bool)
+            unique[0] = True
+            np.not_equal(keys[1:], keys[:-1], out=unique[1:])
+            keys = keys[unique]
+            del unique
+
+        indices = (keys & 0xFFFFFFFF).astype(INDEX_DTYPE)
+        keys >>= 32
+        out_degree = np.bincount(keys, minlength=num_nodes)
+        del keys
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(out_degree, out=indptr[1:])
+
+        in_degree = np.bincount(indices, minlength=num_nodes)
+        node_mask = (out_degree > 0) | (in_degree > 0)
+        G = cls(indptr, indices, node_mask)
+        G._in_degree = in_degree
+        return G
+
+    @classmethod
+    def from_pandas_edgelist(cls, df, source="src", target="dst", num_nodes=None):
+        """Build a graph from two integer columns of a DataFrame.
+
+        Equivalent to nx.from_pandas_edgelist(df, source, target,
+        create_using=nx.DiGraph) without edge attributes.
+        """
+        return cls.from_edgelist(df[source].to_numpy(), df[target].to_numpy(),
+                                 num_nodes=num_nodes)
+
+    @property
+    def num_nodes(self):
+        """The number of rows, i.e. one more than the largest node id."""
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def __len__(self):
+        """The number of nodes that appear in at least one edge, like len(G)."""
+        return int(np.count_nonzero(self.node_mask))
+
+    def nodes(self):
+        """Return the ids of all nodes that appear in at least one edge."""
+        return np.flatnonzero(self.node_mask).astype(INDEX_DTYPE)
+
+    def has_node(self, n):
+        return 0 <= n < self.num_nodes and bool(self.node_mask[n])
+
+    def successors(self, n):
+        return self.indices[self.indptr[n]:self.indptr[n + 1]]
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        if self._in_degree is None:
+            self._in_degree = np.bincount(self.indices, minlength=self.num_nodes)
+        return self._in_degree
+
+    def reverse(self):
+        """Return the graph with every edge reversed (the CSC view of this graph).
+
+        The result is cached, so repeated calls are free.
+        """
+        if self._reverse is None:
+            src = np.repeat(np.arange(self.num_nodes, dtype=INDEX_DTYPE), self.out_degree())
+            R = CSRGraph.from_edgelist(self.indices, src, num_nodes=self.num_nodes)
+            R.node_mask = self.node_mask
+            R._reverse = self
+            self._reverse = R
+        return self._reverse
+
+    def subgraph(self, keep):
+        """Return (H, old_ids): the subgraph induced by a boolean node mask, renumbered.
+
+        Node i of H is node old_ids[i] of this graph. The edges are filtered
+        and relabeled with one gather per edge array, without sorting, since
+        renumbering preserves the order of the ids within each row.
+        """
+        keep = np.asarray(keep, dtype=bool)
+        if keep.shape != (self.num_nodes,):
+            raise ValueError(f"keep must have one entry per node id ({self.num_nodes})")
+        old_ids = np.flatnonzero(keep).astype(INDEX_DTYPE)
+        new_id = np.full(self.num_nodes, -1, dtype=INDEX_DTYPE)
+        new_id[old_ids] = np.arange(len(old_ids), dtype=INDEX_DTYPE)
+
+        src = np.repeat(new_id, self.out_degree())
+        dst = new_id[self.indices]
+        kept = (src >= 0) & (dst >= 0)
+        src, dst = src[kept], dst[kept]
+        indptr = np.zeros(len(old_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(old_ids)), out=indptr[1:])
+        node_mask = np.zeros(len(old_ids), dtype=bool)
+        node_mask[src] = True
+        node_mask[dst] = True
+        return CSRGraph(indptr, dst, node_mask), old_ids
+
+    def to_scipy(self, dtype=np.float64):
+        """Return the adjacency matrix as a scipy.sparse.csr_array.
+
+        The indices array is shared with this graph. SciPy gives both index
+        arrays the wider of their dtypes, so when the edge count fits in the
+        int32 indices, an int32 copy of indptr is passed (4 bytes per node)
+        rather than letting SciPy copy the indices to int64 (8 bytes per
+        edge). Only that copy and the data array of ones are allocated.
+        """
+        import scipy as sp
+
+        n = self.num_nodes
+        data = np.ones(self.num_edges, dtype=dtype)
+        indptr = self.indptr
+        if self.num_edges <= np.iinfo(self.indices.dtype).max:
+            indptr = indptr.astype(self.indices.dtype)
+        return sp.sparse.csr_array((data, self.indices, indptr), shape=(n, n), copy=False)
+
+    def __repr__(self):
+        return f"CSRGraph(num_nodes={self.num_nodes}, num_edges={self.num_edges})"
+
+
+def node_values(G, values, name="values"):
+    """Return values as a dense float64 array indexed by node id.
+
+    values may be a {node: value} dict (as accepted by NetworkX) or an array
+    already indexed by node id. Entries for ids that are not nodes of G are
+    zeroed.
+    """
+    if isinstance(values, dict):
+        x = np.zeros(G.num_nodes, dtype=np.float64)
+        nodes = np.fromiter(values.keys(), dtype=np.int64, count=len(values))
+        if len(nodes) and (nodes.min() < 0 or nodes.max() >= G.num_nodes):
+            raise ValueError(f"{name} contains nodes that are not in the graph")
+        x[nodes] = np.fromiter(values.values(), dtype=np.float64, count=len(values))
+    else:
+        x = np.array(values, dtype=np.float64)
+        if x.shape != (G.num_nodes,):
+            raise ValueError(f"{name} must have one entry per node id ({G.num_nodes}), "
+                             f"got shape {x.shape}")
+    x[~G.node_mask] = 0
+    return x
@@ -0,0 +1,351 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Parallel parser for the multistream Wikipedia pages dump.
+
+archive/wikipedia2csv.py runs ET.iterparse() and a regex over the whole dump on
+a single core. The pages-articles-multistream.xml.bz2 dump is a concatenation
+of independent bz2 streams of 100 pages each, and the accompanying
+multistream-index.txt.bz2 lists the byte offset of every stream, so the dump
+can be cut into byte ranges that are decompressed and parsed independently:
+
+    map     Worker processes each read one range of whole streams, decompress
+            it, and extract the title, redirect target and wiki links of every
+            page. Only these strings travel back to the parent process.
+    reduce  The parent consumes the results in file order and assigns node ids,
+            so the output is identical for any number of workers.
+
+Only a bounded number of ranges are in flight at once, so memory use depends on
+the number of workers and the range size, not on the size of the dump.
+
+    python -m wikigraph.dumpparser enwiki-20240620-pages-articles-multistream.xml.bz2 \\
+        enwiki-20240620-edges.csv enwiki-20240620-nodeids.csv \\
+        --index enwiki-20240620-pages-articles-multistream-index.txt.bz2
+
+As in wikipedia2csv, every page that is not a redirect becomes a node, links
+through redirects point at the redirect target, and links to pages that do not
+exist are dropped. The output files have the same format as those written by
+wikipedia2csv, or the edges can be written as binary or Parquet with --format
+(see edgewriter). The namespace of every node is saved next to the node file
+(see namespaces.load_namespaces()).
+"""
+import argparse
+import bz2
+import html
+import os
+import re
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .edgewriter import FORMATS, write_edgelist
+from .namespaces import MAIN, save_namespaces
+from .parallel import default_workers
+from .redirects import dedupe_edges, remap_edges, resolve_redirects
+from .stringtable import StringTable, grow_array
+
+# The link pattern used by archive/wikipedia2csv.py and wikipedia2csv
+LINK_PATTERN = re.compile(
+    r"\[\[([\w:;,. \-\+\\\/\#\$\%\^\&\*\?\<\>\"\'\(\)]+)"
+    r"(?:\|[\w:;,. \-\+\\\/\#\$\%\^\&\*\?\<\>\"\'\(\)]+)?\]\]"
+)
+_PAGE_PATTERN = re.compile(r"<page>(.*?)</page>", re.S)
+_TITLE_PATTERN = re.compile(r"<title>(.*?)</title>", re.S)
+_NS_PATTERN = re.compile(r"<ns>(-?\d+)</ns>")
+_REDIRECT_PATTERN = re.compile(r'<redirect title="(.*?)"\s*/>', re.S)
+_TEXT_PATTERN = re.compile(r"<text\b[^>]*?(?:/>|>(.*?)</text>)", re.S)
+# The header of a bz2 stream followed by the magic number of its first block
+_STREAM_HEADER = re.compile(rb"BZh[1-9]1AY&SY")
+
+# Compressed bytes handed to a worker at a time
+DEFAULT_RANGE_BYTES = 8 << 20
+# Pages parsed between progress messages
+_PROGRESS_PAGES = 100_000
+
+
+def read_index_offsets(index_path):
+    """Return the sorted, unique stream offsets listed in a multistream index.
+
+    Each line of the index is "offset:page_id:title"; the index may be bz2
+    compressed.
+    """
+    opener = bz2.open if index_path.endswith(".bz2") else open
+    offsets = set()
+    with opener(index_path, "rb") as f:
+        for line in f:
+            offsets.add(int(line.split(b":", 1)[0]))
+    return sorted(offsets)
+
+
+def scan_stream_offsets(dump_path, blocksize=1 << 24):
+    """Return the offsets of the bz2 streams in dump_path by scanning for headers.
+
+    This is slower than reading the multistream index, but only needs one
+    sequential read of the compressed file.
+    """
+    offsets = []
+    overlap = 9  # length of a stream header minus one
+    with open(dump_path, "rb") as f:
+        position = 0
+        tail = b""
+        while block := f.read(blocksize):
+            data = tail + block
+            base = position - len(tail)
+            offsets.extend(base + m.start() for m in _STREAM_HEADER.finditer(data))
+            tail = data[-overlap:]
+            position += len(block)
+    return sorted(set(offsets))
+
+
+def group_ranges(offsets, file_size, range_bytes=DEFAULT_RANGE_BYTES):
+    """Group consecutive streams into (start, stop) byte ranges of about range_bytes."""
+    bounds = [o for o in offsets if o < file_size] + [file_size]
+    ranges = []
+    start = bounds[0]
+    for stop in bounds[1:]:
+        if stop - start >= range_bytes:
+            ranges.append((start, stop))
+            start = stop
+    if start < file_size:
+        ranges.append((start, file_size))
+    return ranges
+
+
+class PageBatch:
+    """The pages parsed from one byte range of the dump.
+
+    titles[i] is the title of page i, namespaces[i] its namespace number and
+    redirects[i] its redirect target (or None). The links of page i are
+    links[link_offsets[i]:link_offsets[i + 1]].
+    """
+
+    def __init__(self, titles, namespaces, redirects, link_offsets, links):
+        self.titles = titles
+        self.namespaces = namespaces
+        self.redirects = redirects
+        self.link_offsets = link_offsets
+        self.links = links
+
+    def __len__(self):
+        return len(self.titles)
+
+
+def parse_pages(xml):
+    """Parse the <page> elements in a fragment of the dump into a PageBatch.
+
+    Links are extracted from the unescaped text of pages that are not
+    redirects, with the same pattern as wikipedia2csv.
+    """
+    titles = []
+    namespaces = array("h")
+    redirects = []
+    link_offsets = array("q", [0])
+    links = []
+    for page in _PAGE_PATTERN.finditer(xml):
+        body = page.group(1)
+        title = _TITLE_PATTERN.search(body)
+        if title is None:
+            continue
+        titles.append(html.unescape(title.group(1)))
+        ns = _NS_PATTERN.search(body)
+        namespaces.append(int(ns.group(1)) if ns is not None else MAIN)
+        redirect = _REDIRECT_PATTERN.search(body)
+        if redirect is not None:
+            redirects.append(html.unescape(redirect.group(1)))
+        else:
+            redirects.append(None)
+            text = _TEXT_PATTERN.search(body)
+            if text is not None and text.group(1):
+                links.extend(m.group(1) for m in LINK_PATTERN.finditer(html.unescape(text.group(1))))
+        link_offsets.append(len(links))
+    return PageBatch(titles, namespaces, redirects, link_offsets, links)
+
+
+def parse_range(dump_path, start, stop):
+    """Decompress and parse the bz2 streams in dump_path[start:stop]."""
+    with open(dump_path, "rb") as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    # bz2.decompress() decodes every concatenated stream in data
+    return parse_pages(bz2.decompress(data).decode("utf-8"))
+
+
+def iter_page_batches(dump_path, ranges, workers=None, max_pending=None):
+    """Yield the PageBatch of every byte range, in order, parsed by worker processes.
+
+    At most max_pending ranges (two per worker by default) are parsed or
+    waiting to be consumed at any time. With workers=1 the ranges are parsed
+    in this process.
+    """
+    workers = workers or default_workers()
+    if workers == 1:
+        for start, stop in ranges:
+            yield parse_range(dump_path, start, stop)
+        return
+
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        try:
+            for start, stop in ranges:
+                pending.append(executor.submit(parse_range, dump_path, start, stop))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+class GraphBuilder:
+    """Reduces PageBatches into a graph with dense node ids.
+
+    Every title (of a page, a redirect target or a link) is interned once in
+    a StringTable. Pages that are not redirects get node ids in the order they
+    are added, and links are kept as interned title ids in append-only int32
+    buffers until finish() resolves them, since a link may point at a page or
+    redirect that appears later in the dump.
+    """
+
+    def __init__(self):
+        self.table = StringTable()
+        self.node_title_ids = array("i")
+        self.node_namespaces = array("h")
+        self.nodeid_of = np.full(1 << 16, -1, dtype=np.int32)
+        self.redirect_src = array("i")
+        self.redirect_dst = array("i")
+        self.src = array("i")
+        self.dst = array("i")
+
+    @property
+    def num_nodes(self):
+        return len(self.node_title_ids)
+
+    def _add_titles(self, titles):
+        title_ids = self.table.add(titles)
+        self.nodeid_of = grow_array(self.nodeid_of, len(self.table), fill=-1)
+        return title_ids
+
+    def add_batch(self, batch):
+        title_ids = self._add_titles(batch.titles)
+        is_redirect = np.fromiter((r is not None for r in batch.redirects), dtype=bool,
+                                  count=len(batch))
+        self.redirect_src.extend(title_ids[is_redirect].tolist())
+        self.redirect_dst.extend(
+            self._add_titles([r for r in batch.redirects if r is not None]).tolist())
+
+        # A page becomes a node the first time its title is seen as a non-redirect
+        pages = np.flatnonzero(~is_redirect)
+        _, first = np.unique(title_ids[pages], return_index=True)
+        pages = np.sort(pages[first])
+        pages = pages[self.nodeid_of[title_ids[pages]] < 0]
+        nodeids = np.arange(self.num_nodes, self.num_nodes + len(pages), dtype=np.int32)
+        self.nodeid_of[title_ids[pages]] = nodeids
+        self.node_title_ids.extend(title_ids[pages].tolist())
+        self.node_namespaces.extend(np.frombuffer(batch.namespaces, dtype=np.int16)[pages].tolist())
+
+        # Only the links of the pages that became nodes are kept
+        page_nodeid = np.full(len(batch), -1, dtype=np.int32)
+        page_nodeid[pages] = nodeids
+        link_nodeid = np.repeat(page_nodeid, np.diff(batch.link_offsets))
+        keep = link_nodeid >= 0
+        links = np.asarray(batch.links, dtype=object)[keep]
+        self.src.frombytes(link_nodeid[keep].tobytes())
+        self.dst.frombytes(self._add_titles(links).tobytes())
+
+    def node_titles(self, nodeids=None):
+        """Return the titles of nodeids (by default all nodes) as a list."""
+        title_ids = np.frombuffer(self.node_title_ids, dtype=np.int32)
+        return self.table.strings(title_ids if nodeids is None else title_ids[nodeids])
+
+    def finish(self, dedupe=True):
+        """Return (src, dst) int32 node id arrays of the links that resolve to a page.
+
+        Links through redirects point at the final redirect target. With
+        dedupe=True, repeated links between the same two pages are collapsed
+        and the edges come out sorted.
+        """
+        num_titles = len(self.table)
+        target = resolve_redirects(np.frombuffer(self.redirect_src, dtype=np.int32),
+                                   np.frombuffer(self.redirect_dst, dtype=np.int32),
+                                   num_titles)
+        # Title id -> node id of the page it finally refers to, or -1
+        lookup = np.where(target >= 0, self.nodeid_of[:num_titles][target], -1)
+        src, dst = remap_edges(np.frombuffer(self.src, dtype=np.int32),
+                               np.frombuffer(self.dst, dtype=np.int32), lookup)
+        if dedupe:
+            src, dst = dedupe_edges(src, dst)
+        return src, dst
+
+
+def parse_dump(dump_path, index_path=None, workers=None, range_bytes=DEFAULT_RANGE_BYTES,
+               max_pages=None, verbose=False):
+    """Parse a multistream pages dump and return a finished GraphBuilder.
+
+    Stream offsets are read from index_path if given, otherwise found by
+    scanning the dump. max_pages stops after about that many pages (whole
+    ranges are parsed, so a few more may be included).
+    """
+    if index_path:
+        offsets = read_index_offsets(index_path)
+    else:
+        offsets = scan_stream_offsets(dump_path)
+    if not offsets:
+        raise ValueError(f"{dump_path} does not contain any bz2 streams")
+    ranges = group_ranges(offsets, os.path.getsize(dump_path), range_bytes)
+
+    builder = GraphBuilder()
+    num_pages = 0
+    next_report = _PROGRESS_PAGES
+    st = time.perf_counter()
+    for batch in iter_page_batches(dump_path, ranges, workers):
+        builder.add_batch(batch)
+        num_pages += len(batch)
+        if verbose and num_pages >= next_report:
+            print(f"processed {num_pages} pages in {time.perf_counter() - st:.1f}s...")
+            next_report += _PROGRESS_PAGES
+        if max_pages is not None and num_pages >= max_pages:
+            break
+    return builder
+
+
+def write_nodes(path, builder, chunksize=1 << 20):
+    with open(path, "w", encoding="utf-8") as f:
+        for start in range(0, builder.num_nodes, chunksize):
+            nodeids = range(start, min(start + chunksize, builder.num_nodes))
+            for nodeid, title in zip(nodeids, builder.node_titles(nodeids)):
+                f.write(f'{nodeid}\t"{title}"\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m wikigraph.dumpparser",
+        description="Convert a multistream Wikipedia pages dump into edge and node id files.",
+    )
+    parser.add_argument("dump", help="the pages-articles-multistream.xml.bz2 file")
+    parser.add_argument("edges_output_file",
+                        help="src dst node ids (a directory for --format binary)")
+    parser.add_argument("nodes_output_file", help="tab-separated node id and title")
+    parser.add_argument("--index", help="the multistream-index.txt.bz2 file (scanned for if omitted)")
+    parser.add_argument("--format", choices=FORMATS, default="csv",
+                        help="edge list format (default: space-separated text)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--range-bytes", type=int, default=DEFAULT_RANGE_BYTES)
+    parser.add_argument("--max-pages", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    st = time.perf_counter()
+    builder = parse_dump(args.dump, args.index, args.workers, args.range_bytes,
+                         args.max_pages, verbose=True)
+    src, dst = builder.finish()
+    print(f"parsed {builder.num_nodes} pages and {len(src)} links "
+          f"in {time.perf_counter() - st:.1f}s")
+    write_edgelist(args.edges_output_file, src, dst, format=args.format, workers=args.workers)
+    write_nodes(args.nodes_output_file, builder)
+    save_namespaces(args.nodes_output_file, np.frombuffer(builder.node_namespaces, dtype=np.int16))
+
+
+if __name__ == "__main__":
+    main()
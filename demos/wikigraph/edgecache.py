@@ -0,0 +1,228 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Binary cache for the space-separated edge list files.
+
+Parsing the full Wikipedia edge list with pd.read_csv() takes minutes on every
+run. The first call to load_edgelist() streams the CSV once into two raw
+little-endian int32 column files (src.i32 and dst.i32) next to a small JSON
+metadata file. Later calls memory-map those columns, so they load nearly
+instantly and share the OS page cache with every other process that reads them.
+
+The metadata records the size, mtime and BLAKE2b digest of the source CSV. The
+digest is computed while the CSV is parsed, so it costs no extra pass over the
+file. On load, size and mtime are always checked; pass verify=True to also
+recompute the digest.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+EDGE_DTYPE = np.dtype("<i4")
+META_FILE = "meta.json"
+FORMAT_VERSION = 1
+
+
+class _HashingReader:
+    """File wrapper that feeds every byte read through a hash object."""
+
+    def __init__(self, f, digest):
+        self.f = f
+        self.digest = digest
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.digest.update(data)
+        return data
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.f.readline()
+        if not line:
+            raise StopIteration
+        self.digest.update(line)
+        return line
+
+
+def file_digest(path, blocksize=1 << 24):
+    """Return the hex BLAKE2b digest of the file at path."""
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        while block := f.read(blocksize):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_info(path, digest=None):
+    """Return the fingerprint of a source file that is stored in cache metadata.
+
+    digest is the hex BLAKE2b digest of the file if the caller has already
+    computed it while reading the file; otherwise it is computed here.
+    """
+    st = os.stat(path)
+    return {
+        "path": os.path.abspath(path),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "blake2b": digest or file_digest(path),
+    }
+
+
+def default_cache_dir(csv_path):
+    return f"{csv_path}.cache"
+
+
+def read_meta(cache_dir):
+    """Return the metadata dict of a cache directory, or None if there is none."""
+    try:
+        with open(os.path.join(cache_dir, META_FILE)) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if meta.get("version") != FORMAT_VERSION:
+        return None
+    return meta
+
+
+def write_meta(cache_dir, meta):
+    """Atomically write the metadata file of cache_dir.
+
+    The metadata file is written last, so a directory without one is never
+    mistaken for a complete cache.
+    """
+    meta = {"version": FORMAT_VERSION, **meta}
+    tmp_path = os.path.join(cache_dir, f".{META_FILE}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp_path, os.path.join(cache_dir, META_FILE))
+    return meta
+
+
+def write_columns(cache_dir, columns, num_rows, extra_meta=None):
+    """Write the metadata file for int32 column files already in cache_dir."""
+    return write_meta(cache_dir, {
+        "dtype": EDGE_DTYPE.str,
+        "num_rows": int(num_rows),
+        "columns": list(columns),
+        **(extra_meta or {}),
+    })
+
+
+def columns_digest(cache_dir, columns, blocksize=1 << 24):
+    """Return the hex BLAKE2b digest of the column files of cache_dir, in order."""
+    digest = hashlib.blake2b()
+    for name in columns:
+        with open(os.path.join(cache_dir, f"{name}.i32"), "rb") as f:
+            while block := f.read(blocksize):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def edgelist_digest(cache_dir, meta):
+    """Return the BLAKE2b digest that identifies the edges of a cache directory.
+
+    That is the digest of the source CSV for a cache built by
+    convert_edgelist(), and the digest of the column files for one written
+    directly (write_edgelist(format="binary") records it in the metadata; it
+    is computed here for directories written before it did).
+    """
+    if "source" in meta:
+        return meta["source"]["blake2b"]
+    return meta.get("blake2b") or columns_digest(cache_dir, meta["columns"])
+
+
+def is_current(meta, csv_path, verify=False):
+    """Return True if meta describes a cache built from the current csv_path."""
+    source = meta.get("source") if meta else None
+    if source is None:
+        return False
+    st = os.stat(csv_path)
+    if st.st_size != source["size"] or st.st_mtime_ns != source["mtime_ns"]:
+        return False
+    if verify:
+        return file_digest(csv_path) == source["blake2b"]
+    return True
+
+
+def convert_edgelist(csv_path, cache_dir=None, sep=" ", chunksize=50_000_000):
+    """Parse the edge list at csv_path once and write it to cache_dir.
+
+    The CSV is read in chunks of chunksize rows so memory use is bounded by the
+    chunk size rather than the file size. Returns the new metadata dict.
+    """
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    tmp_dir = f"{cache_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    digest = hashlib.blake2b()
+    num_rows = 0
+    with open(csv_path, "rb") as raw, \
+         open(os.path.join(tmp_dir, "src.i32"), "wb") as src_out, \
+         open(os.path.join(tmp_dir, "dst.i32"), "wb") as dst_out:
+        reader = pd.read_csv(
+            _HashingReader(raw, digest),
+            sep=sep,
+            names=["src", "dst"],
+            dtype="int32",
+            chunksize=chunksize,
+        )
+        for chunk in reader:
+            chunk["src"].to_numpy(EDGE_DTYPE).tofile(src_out)
+            chunk["dst"].to_numpy(EDGE_DTYPE).tofile(dst_out)
+            num_rows += len(chunk)
+        # Anything the parser did not consume (nothing, normally) must still be
+        # part of the digest.
+        while block := raw.read(1 << 24):
+            digest.update(block)
+
+    meta = write_columns(tmp_dir, ["src", "dst"], num_rows, {
+        "source": source_info(csv_path, digest.hexdigest()),
+    })
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    return meta
+
+
+def map_column(cache_dir, name, num_rows):
+    """Return a read-only memory map of one int32 column file."""
+    if num_rows == 0:
+        # np.memmap cannot map an empty file
+        return np.empty(0, dtype=EDGE_DTYPE)
+    return np.memmap(os.path.join(cache_dir, f"{name}.i32"),
+                     dtype=EDGE_DTYPE, mode="r", shape=(num_rows,))
+
+
+def load_edge_arrays(path, cache_dir=None, verify=False, sep=" "):
+    """Return memory-mapped (src, dst) int32 arrays for the edge list at path.
+
+    path may be an edge list CSV, in which case the cache next to it is built
+    or refreshed as needed, or an existing cache directory.
+    """
+    if os.path.isdir(path):
+        cache_dir = path
+        meta = read_meta(cache_dir)
+        if meta is None:
+            raise ValueError(f"{path} is not an edge list cache directory")
+    else:
+        cache_dir = cache_dir or default_cache_dir(path)
+        meta = read_meta(cache_dir)
+        if not is_current(meta, path, verify=verify):
+            meta = convert_edgelist(path, cache_dir, sep=sep)
+    num_rows = meta["num_rows"]
+    return (map_column(cache_dir, "src", num_rows),
+            map_column(cache_dir, "dst", num_rows))
+
+
+def load_edgelist(path, cache_dir=None, verify=False, sep=" "):
+    """Drop-in replacement for reading the edge list with pd.read_csv().
+
+    Returns a DataFrame with int32 "src" and "dst" columns, just like
+    pd.read_csv(path, sep=" ", names=["src", "dst"], dtype="int32").
+    """
+    src, dst = load_edge_arrays(path, cache_dir=cache_dir, verify=verify, sep=sep)
+    return pd.DataFrame({"src": src, "dst": dst}, copy=False)
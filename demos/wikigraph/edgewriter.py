@@ -0,0 +1,140 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Bulk writers for (src, dst) edge arrays.
+
+Writing an edge list with one formatted write per edge ("%d %d\\n" % (src, d)
+in archive/wikipedia2csv.py, writeln! in wikipedia2csv) is CPU-bound long
+before the disk is. write_edgelist() writes whole chunks of edges at a time in
+one of three formats:
+
+    csv      The space-separated text read by the demos. The digits of a chunk
+             are computed with NumPy into a byte matrix, so there is no
+             per-edge Python work, and chunks are formatted in parallel.
+    binary   An edge list cache directory (see edgecache), which
+             load_edge_arrays() and load_edgelist() memory-map directly.
+    parquet  A Parquet file with int32 "src" and "dst" columns (requires
+             pyarrow).
+"""
+import hashlib
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .edgecache import EDGE_DTYPE, write_columns
+from .parallel import default_workers
+
+FORMATS = ("csv", "binary", "parquet")
+DEFAULT_CHUNKSIZE = 1 << 22
+# Smallest chunk formatted by one csv worker
+_MIN_WORKER_CHUNK = 1 << 16
+# Enough digits for any non-negative int32
+_DIGITS = 10
+# _PAIRS[i] holds the two ASCII digits of 0 <= i < 100 as they appear in memory
+_PAIRS = np.frombuffer("".join(f"{i:02d}" for i in range(100)).encode("ascii"), dtype=np.uint16)
+_THRESHOLDS = 10 ** np.arange(1, _DIGITS, dtype=np.int64)
+
+
+def _digits(values):
+    """Return the zero-padded ASCII digits of values as a (len(values), _DIGITS) array."""
+    values = values.astype(np.uint32)
+    pairs = np.empty((len(values), _DIGITS // 2), dtype=np.uint16)
+    # Two digits per pass, from the right
+    for k in range(_DIGITS // 2 - 1, -1, -1):
+        values, remainder = np.divmod(values, np.uint32(100))
+        pairs[:, k] = _PAIRS[remainder]
+    return pairs.view(np.uint8)
+
+
+def format_edges(src, dst):
+    """Return the "src dst\\n" lines of a chunk of edges as one bytes object."""
+    n = len(src)
+    width = 2 * _DIGITS + 2
+    lines = np.empty((n, width), dtype=np.uint8)
+    keep = np.ones((n, width), dtype=bool)
+    column = np.arange(_DIGITS)
+    for start, values in ((0, src), (_DIGITS + 1, dst)):
+        values = np.asarray(values)
+        lines[:, start:start + _DIGITS] = _digits(values)
+        # Drop the leading zeros (but keep the last digit of 0)
+        num_digits = np.searchsorted(_THRESHOLDS, values, side="right") + 1
+        keep[:, start:start + _DIGITS] = column >= (_DIGITS - num_digits)[:, None]
+    lines[:, _DIGITS] = ord(" ")
+    lines[:, -1] = ord("\n")
+    return lines[keep].tobytes()
+
+
+def _write_csv(path, src, dst, chunksize, workers):
+    # NumPy releases the GIL while formatting, so chunks are formatted in
+    # threads, a bounded number at a time, and written in order. Each chunk is
+    # split among the workers, so the edges in flight stay about chunksize.
+    chunksize = max(chunksize // workers, min(chunksize, _MIN_WORKER_CHUNK))
+    starts = range(0, len(src), chunksize)
+    with open(path, "wb") as f, ThreadPoolExecutor(workers) as executor:
+        for group in range(0, len(starts), workers):
+            chunks = [(src[start:start + chunksize], dst[start:start + chunksize])
+                      for start in starts[group:group + workers]]
+            for text in executor.map(lambda chunk: format_edges(*chunk), chunks):
+                f.write(text)
+
+
+def _write_binary(path, src, dst, chunksize, workers):
+    tmp_dir = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    # The digest of the columns, as edgelist_digest() would compute it, keys
+    # the caches built from this directory
+    digest = hashlib.blake2b()
+    for name, values in (("src", src), ("dst", dst)):
+        with open(os.path.join(tmp_dir, f"{name}.i32"), "wb") as f:
+            for start in range(0, len(values), chunksize):
+                block = values[start:start + chunksize].astype(EDGE_DTYPE)
+                block.tofile(f)
+                digest.update(block)
+    write_columns(tmp_dir, ["src", "dst"], len(src), {"blake2b": digest.hexdigest()})
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_dir, path)
+
+
+def _write_parquet(path, src, dst, chunksize, workers):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("writing Parquet edge lists requires pyarrow") from e
+
+    schema = pa.schema([("src", pa.int32()), ("dst", pa.int32())])
+    with pq.ParquetWriter(path, schema) as writer:
+        for start in range(0, len(src), chunksize):
+            stop = start + chunksize
+            writer.write_table(pa.table({
+                "src": np.asarray(src[start:stop], dtype=np.int32),
+                "dst": np.asarray(dst[start:stop], dtype=np.int32),
+            }, schema=schema))
+
+
+_WRITERS = {"csv": _write_csv, "binary": _write_binary, "parquet": _write_parquet}
+
+
+def write_edgelist(path, src, dst, format="csv", chunksize=DEFAULT_CHUNKSIZE, workers=None):
+    """Write parallel arrays of non-negative int32 node ids as an edge list.
+
+    format is one of FORMATS; for "binary", path is the cache directory to
+    create. Edges are written chunksize at a time. For "csv", each chunk is
+    split among up to workers formatting threads, whose temporaries (the digit
+    matrix and its mask, the selected bytes and the text) take about 90 bytes
+    per edge in flight, so memory use beyond the inputs is about
+    90 * chunksize bytes (some 380 MB by default) whatever the number of
+    workers. Raises ValueError for ids outside the int32 range.
+    """
+    if format not in _WRITERS:
+        raise ValueError(f"unknown edge list format {format!r}, expected one of {FORMATS}")
+    src = np.asarray(src)
+    dst = np.asarray(dst)
+    if len(src) != len(dst):
+        raise ValueError("src and dst must have the same length")
+    if len(src) and min(src.min(), dst.min()) < 0:
+        raise ValueError("node ids must be non-negative")
+    if len(src) and max(src.max(), dst.max()) > np.iinfo(EDGE_DTYPE).max:
+        raise ValueError(f"node ids must fit in int32, got {max(src.max(), dst.max())}")
+    _WRITERS[format](path, src, dst, chunksize, workers or default_workers())
@@ -0,0 +1,63 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Attach per-node algorithm results to DataFrames without dict round trips.
+
+Algorithm results indexed by node id (as returned by pagerank_array() and
+hits_arrays(), or converted once from a NetworkX dict with dict_to_array())
+can be attached to the page metadata with a single positional take:
+
+    nodedata_df["pagerank"] = node_column(pr, nodedata_df["nodeid"], G.node_mask)
+
+This replaces building a DataFrame from dict keys and values (or from a list
+of per-node tuples) followed by a merge on "nodeid", which materializes a
+Python object for every node.
+"""
+import numpy as np
+import pandas as pd
+
+
+def dict_to_array(values, num_nodes=None, fill=np.nan, dtype=np.float64):
+    """Convert a {nodeid: value} result dict into an array indexed by node id.
+
+    Keys and values are read with np.fromiter, so no intermediate lists or
+    tuples are created. Ids missing from values are set to fill.
+    """
+    count = len(values)
+    nodeids = np.fromiter(values.keys(), dtype=np.int64, count=count)
+    if num_nodes is None:
+        num_nodes = int(nodeids.max()) + 1 if count else 0
+    out = np.full(num_nodes, fill, dtype=dtype)
+    out[nodeids] = np.fromiter(values.values(), dtype=dtype, count=count)
+    return out
+
+
+def node_column(values, nodeids, node_mask=None, fill=np.nan):
+    """Return values[nodeids] as a column for a table with a "nodeid" column.
+
+    values is indexed by node id. Ids outside of values, and ids excluded by
+    node_mask (e.g. CSRGraph.node_mask for ids that are not in the graph), get
+    fill, just like the missing rows of a left merge.
+    """
+    values = np.asarray(values)
+    nodeids = np.asarray(nodeids)
+    valid = (nodeids >= 0) & (nodeids < len(values))
+    if node_mask is not None:
+        valid[valid] = node_mask[nodeids[valid]]
+    if valid.all():
+        return values[nodeids]
+    out = np.full(len(nodeids), fill, dtype=np.result_type(values, type(fill)))
+    out[valid] = values[nodeids[valid]]
+    return out
+
+
+def results_frame(G, **columns):
+    """Return a DataFrame of node-aligned result arrays, indexed by "nodeid".
+
+    Only the nodes of G are included, in node id order. For example:
+
+        results_frame(G, pagerank=pr, hub_val=hubs, auth_val=authorities)
+    """
+    nodeids = G.nodes()
+    return pd.DataFrame(
+        {name: np.asarray(values)[nodeids] for name, values in columns.items()},
+        index=pd.Index(nodeids, name="nodeid"),
+    )
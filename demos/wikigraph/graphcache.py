@@ -0,0 +1,257 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""A persistent cache of CSR graphs and algorithm results across sessions.
+
+nx.config.cache_converted_graphs only keeps a converted graph for the life of
+one Python process, so every new session builds the graph and reruns PageRank
+from scratch. A GraphCache stores on disk:
+
+    graph       the CSRGraph of an edge list and its reverse (the CSC view
+                that PageRank and HITS iterate over)
+    pagerank    pagerank_array() results
+    hits        hits_arrays() results
+    bfs         bfs() distances and predecessors
+
+keyed by the fingerprint of the edge list (the BLAKE2b digest of the CSV, or
+of the columns of a binary edge list, that the edge list cache already
+records, see edgecache.py) and the algorithm parameters. Entries are loaded
+memory-mapped, so a repeated analysis starts in the time it takes to read the
+metadata, and only the pages that are used are read from disk:
+
+    cache = GraphCache()
+    G = cache.graph(edgelist_csv)
+    pr = cache.pagerank(edgelist_csv, alpha=0.85)
+    scipy_bfs = cache.bfs(edgelist_csv, scipy_nodeid)
+
+The cache is bounded by max_bytes. Every load marks an entry as used (the
+mtime of its metadata file), and when a new entry takes the cache above
+max_bytes, the least recently used entries are removed. The cache directory is
+shared by all edge lists, so a copy or a renamed edge list hits the same
+entries. It is WIKIGRAPH_CACHE if that environment variable is set, and
+wikigraph.cache in the current directory otherwise.
+"""
+import hashlib
+import inspect
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .bfs import BFSResult, bfs
+from .csr import CSRGraph
+from .edgecache import (
+    META_FILE, default_cache_dir, edgelist_digest, load_edge_arrays, read_meta, write_meta,
+)
+from .hits import hits_arrays
+from .pagerank import pagerank_array
+from .pipeline import _code_hash, load_result, save_result
+
+CACHE_ENV = "WIKIGRAPH_CACHE"
+DEFAULT_CACHE_DIR = "wikigraph.cache"
+DEFAULT_MAX_BYTES = 16 << 30
+GRAPH_CACHE_FORMAT = 2
+# The function computing each kind of entry; its code is part of the key
+_ALGORITHMS = {
+    "graph": CSRGraph.from_edgelist,
+    "pagerank": pagerank_array,
+    "hits": hits_arrays,
+    "bfs": bfs,
+}
+# Arguments that do not change the result
+_UNKEYED = frozenset(["G", "src", "dst", "telemetry", "workers"])
+
+
+def edgelist_fingerprint(path):
+    """Return the BLAKE2b digest of the edge list behind path.
+
+    path is an edge list CSV or an edge list cache directory, including one
+    written by write_edgelist(format="binary"). The digest is taken from the
+    edge list cache metadata (see edgelist_digest()), which is built or
+    refreshed if needed, so the CSV is not read again.
+    """
+    cache_dir = path if os.path.isdir(path) else default_cache_dir(path)
+    load_edge_arrays(path)
+    return edgelist_digest(cache_dir, read_meta(cache_dir))
+
+
+def _param_key(value):
+    """Return a JSON-compatible stand-in for an algorithm parameter."""
+    if isinstance(value, dict):
+        value = (np.fromiter(value.keys(), dtype=np.int64, count=len(value)),
+                 np.fromiter(value.values(), dtype=np.float64, count=len(value)))
+    if isinstance(value, tuple):
+        return [_param_key(v) for v in value]
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        digest = hashlib.blake2b(value.view(np.uint8), digest_size=16).hexdigest()
+        return {"dtype": value.dtype.str, "shape": list(value.shape), "blake2b": digest}
+    return value
+
+
+def _algorithm_params(kind, params):
+    """Return the key of the parameters of an entry, with the defaults filled in.
+
+    pagerank(e) and pagerank(e, alpha=0.85) thus share an entry.
+    """
+    bound = inspect.signature(_ALGORITHMS[kind]).bind_partial(**params)
+    bound.apply_defaults()
+    return {name: _param_key(value) for name, value in bound.arguments.items()
+            if name not in _UNKEYED}
+
+
+class GraphCache:
+    """Graphs and algorithm results stored under cache_dir (see the module docstring)."""
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or os.environ.get(CACHE_ENV, DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+        self._fingerprints = {}
+        self._graphs = {}
+
+    def fingerprint(self, edgelist):
+        if edgelist not in self._fingerprints:
+            self._fingerprints[edgelist] = edgelist_fingerprint(edgelist)
+        return self._fingerprints[edgelist]
+
+    def _path(self, kind, fingerprint, params):
+        algorithm = _ALGORITHMS.get(kind)
+        encoded = json.dumps({
+            "kind": kind,
+            "format": GRAPH_CACHE_FORMAT,
+            # Results of an older implementation are not reused
+            "code": _code_hash(algorithm) if algorithm else None,
+            "fingerprint": fingerprint,
+            "params": params,
+        }, sort_keys=True).encode("utf-8")
+        key = hashlib.blake2b(encoded, digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, kind, key)
+
+    def get(self, kind, fingerprint, params):
+        """Return the stored dict of arrays for an entry, or None if there is none."""
+        path = self._path(kind, fingerprint, params)
+        meta = read_meta(path)
+        if meta is None or meta.get("format") != GRAPH_CACHE_FORMAT:
+            return None
+        # The mtime of the metadata file is the last use, for eviction
+        os.utime(os.path.join(path, META_FILE))
+        return load_result(path, meta)
+
+    def put(self, kind, fingerprint, params, arrays):
+        """Store a dict of arrays as an entry and return it memory-mapped."""
+        path = self._path(kind, fingerprint, params)
+        tmp_dir = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        meta = save_result(tmp_dir, arrays)
+        write_meta(tmp_dir, {"format": GRAPH_CACHE_FORMAT, "kind": kind,
+                             "fingerprint": fingerprint, "params": params, **meta})
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_dir, path)
+        self.evict(protect=path)
+        return load_result(path, read_meta(path))
+
+    def entries(self):
+        """Return a DataFrame of the stored entries, least recently used first."""
+        rows = []
+        for kind in os.listdir(self.cache_dir) if os.path.isdir(self.cache_dir) else []:
+            kind_dir = os.path.join(self.cache_dir, kind)
+            for entry in os.scandir(kind_dir):
+                meta = read_meta(entry.path) if ".tmp-" not in entry.name else None
+                if meta is None:
+                    continue
+                rows.append({
+                    "kind": kind,
+                    "path": entry.path,
+                    "params": meta["params"],
+                    "nbytes": meta["nbytes"],
+                    "last_used_ns": os.stat(os.path.join(entry.path, META_FILE)).st_mtime_ns,
+                })
+        frame = pd.DataFrame(rows, columns=["kind", "path", "params", "nbytes", "last_used_ns"])
+        return frame.sort_values("last_used_ns", ignore_index=True)
+
+    def evict(self, max_bytes=None, protect=None):
+        """Remove the least recently used entries until the cache fits in max_bytes.
+
+        max_bytes defaults to self.max_bytes. The entry at path protect is kept
+        even if it alone is larger than max_bytes.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = int(entries["nbytes"].sum())
+        for path, nbytes in zip(entries["path"], entries["nbytes"]):
+            if total <= max_bytes:
+                break
+            if path != protect:
+                shutil.rmtree(path, ignore_errors=True)
+                total -= nbytes
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self._graphs.clear()
+
+    def graph(self, edgelist):
+        """Return the CSRGraph of an edge list CSV (or edge list cache directory).
+
+        The graph and its reverse are built once and then loaded memory-mapped.
+        """
+        fingerprint = self.fingerprint(edgelist)
+        if fingerprint in self._graphs:
+            return self._graphs[fingerprint]
+        key = _algorithm_params("graph", {})
+        arrays = self.get("graph", fingerprint, key)
+        if arrays is None:
+            G = CSRGraph.from_edgelist(*load_edge_arrays(edgelist))
+            R = G.reverse()
+            arrays = self.put("graph", fingerprint, key, {
+                "indptr": G.indptr, "indices": G.indices, "node_mask": G.node_mask,
+                "reverse_indptr": R.indptr, "reverse_indices": R.indices,
+            })
+        G = CSRGraph(arrays["indptr"], arrays["indices"], arrays["node_mask"])
+        R = CSRGraph(arrays["reverse_indptr"], arrays["reverse_indices"], arrays["node_mask"])
+        G._reverse, R._reverse = R, G
+        self._graphs[fingerprint] = G
+        return G
+
+    def pagerank(self, edgelist, telemetry=None, workers=1, **params):
+        """Return pagerank_array() of the graph of an edge list, from the cache if possible.
+
+        params are passed to pagerank_array() and are part of the key, with
+        the defaults filled in; array and dict parameters (personalization,
+        nstart, dangling) are keyed by their digest. The key also covers the
+        code of pagerank_array(). telemetry only records iterations that
+        actually run.
+        """
+        fingerprint = self.fingerprint(edgelist)
+        key = _algorithm_params("pagerank", params)
+        arrays = self.get("pagerank", fingerprint, key)
+        if arrays is None:
+            x = pagerank_array(self.graph(edgelist), telemetry=telemetry, workers=workers,
+                               **params)
+            arrays = self.put("pagerank", fingerprint, key, {"pagerank": x})
+        return arrays["pagerank"]
+
+    def hits(self, edgelist, telemetry=None, workers=1, **params):
+        """Return hits_arrays() (hubs, authorities) of the graph of an edge list, cached."""
+        fingerprint = self.fingerprint(edgelist)
+        key = _algorithm_params("hits", params)
+        arrays = self.get("hits", fingerprint, key)
+        if arrays is None:
+            h, a = hits_arrays(self.graph(edgelist), telemetry=telemetry, workers=workers,
+                               **params)
+            arrays = self.put("hits", fingerprint, key, {"hubs": h, "authorities": a})
+        return arrays["hubs"], arrays["authorities"]
+
+    def bfs(self, edgelist, source):
+        """Return the BFSResult of bfs() from source in the graph of an edge list, cached."""
+        fingerprint = self.fingerprint(edgelist)
+        key = _algorithm_params("bfs", {"source": int(source)})
+        arrays = self.get("bfs", fingerprint, key)
+        if arrays is None:
+            result = bfs(self.graph(edgelist), source)
+            arrays = self.put("bfs", fingerprint, key, {
+                "distance": result.distance, "predecessor": result.predecessor,
+            })
+        return BFSResult(source, arrays["distance"], arrays["predecessor"])
+
+    def __repr__(self):
+        return f"GraphCache({self.cache_dir!r}, max_bytes={self.max_bytes})"
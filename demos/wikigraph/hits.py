@@ -0,0 +1,73 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""HITS hubs and authorities as power iteration of sparse matrix-vector products.
+
+hits_arrays() iterates x <- A.T @ (A @ x) without forming A.T @ A, which
+converges to the same principal singular vectors that nx.hits() computes with
+ARPACK, and returns arrays indexed by node id instead of dicts.
+"""
+import time
+
+import networkx as nx
+import numpy as np
+
+from .csr import node_values
+from .pagerank import TopKTracker, as_graph
+from .parallel import RowBlockMatrix
+
+
+def hits_arrays(G, max_iter=100, tol=1.0e-8, nstart=None, normalized=True,
+                telemetry=None, workers=1, top_k=None, patience=3):
+    """Return (hubs, authorities) of every node id as float64 arrays.
+
+    G is a CSRGraph or an edge list DataFrame with "src" and "dst" columns.
+    nstart may be a {node: value} dict or an array indexed by node id. Ids that
+    are not nodes of the graph get 0 for both scores. telemetry, workers,
+    top_k and patience work as for pagerank_array(); the iterate is the
+    authority vector, so nstart may be a previous authorities result and
+    top_k tracks the top authorities.
+
+    Raises nx.PowerIterationFailedConvergence if the iteration does not
+    converge within max_iter iterations.
+    """
+    G = as_graph(G)
+    if len(G) == 0:
+        return (np.zeros(G.num_nodes, dtype=np.float64),
+                np.zeros(G.num_nodes, dtype=np.float64))
+    if max_iter <= 0:
+        raise nx.PowerIterationFailedConvergence(max_iter)
+
+    if nstart is None:
+        x = np.where(G.node_mask, 1.0 / len(G), 0.0)
+    else:
+        x = node_values(G, nstart, "nstart")
+        x /= x.sum()
+
+    with RowBlockMatrix.from_graph(G, workers) as A, \
+         RowBlockMatrix.from_graph(G.reverse(), workers) as AT:
+        h = np.empty_like(x)
+        tracker = TopKTracker(top_k, patience) if top_k else None
+        for i in range(1, max_iter + 1):
+            st = time.perf_counter()
+            xlast = x
+            x = AT.matvec(A.matvec(xlast, out=h))
+            x /= x.max()
+            err = np.absolute(x - xlast).sum()
+            if telemetry is not None:
+                telemetry.record(i, float(err), time.perf_counter() - st)
+            if err < tol:
+                if telemetry is not None:
+                    telemetry.converged = True
+                break
+            if tracker is not None and tracker.update(x):
+                if telemetry is not None:
+                    telemetry.top_k_stable = True
+                break
+        else:
+            raise nx.PowerIterationFailedConvergence(max_iter)
+
+        a = x
+        h = A.matvec(a)
+    if normalized:
+        h /= h.sum()
+        a /= a.sum()
+    return h, a
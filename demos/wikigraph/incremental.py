@@ -0,0 +1,233 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Incremental graph builds that keep node ids stable across Wikipedia dumps.
+
+The node ids in the files written by wikipedia2csv are assigned afresh for
+every dump, so results from last month's graph cannot be compared with, or
+reused for, this month's. A GraphBuild stores a graph in "stable" ids, where a
+title keeps its id for as long as it exists:
+
+    <build>/titles/     TitleIndex of stable id <-> title (see titleindex)
+    <build>/edges/      sorted, de-duplicated edges in stable ids, as an edge
+                        list cache directory (see edgecache)
+    <build>/pagerank.npy
+                        PageRank of every stable id, if computed
+
+update_build() maps the titles of a new dump onto the stable ids of a previous
+build (new titles get new ids, ids of removed titles are retired, not reused)
+and diffs the edges into a GraphDelta of added and removed edges. The PageRank
+of the new build is then warm-started from the previous one, so the number of
+iterations depends on how much the graph changed, not on its size:
+
+    prev = GraphBuild.load("builds/20240520")
+    build, delta = update_build(prev, "enwiki-20240620-edges.csv",
+                                "enwiki-20240620-nodeids.csv")
+    print(delta)
+    build.pagerank = refresh_pagerank(build, prev.pagerank)
+    build.save("builds/20240620")
+"""
+import argparse
+import os
+import shutil
+
+import numpy as np
+
+from .csr import CSRGraph
+from .edgecache import load_edge_arrays, read_meta, write_meta
+from .edgewriter import write_edgelist
+from .nodetable import load_nodetable
+from .pagerank import ConvergenceLog, pagerank_array
+from .redirects import dedupe_edges
+from .titleindex import TitleIndex
+
+_PAGERANK_FILE = "pagerank.npy"
+
+
+def _edge_keys(src, dst):
+    keys = np.asarray(src).astype(np.int64)
+    keys <<= 32
+    keys |= np.asarray(dst).astype(np.int64)
+    return keys
+
+
+def _split_keys(keys):
+    return (keys >> 32).astype(np.int32), (keys & 0xFFFFFFFF).astype(np.int32)
+
+
+def _missing_from(keys, sorted_keys):
+    """Return the entries of keys that are not in sorted_keys."""
+    if len(sorted_keys) == 0:
+        return keys
+    pos = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return keys[sorted_keys[pos] != keys]
+
+
+def _known_edges(src, dst, num_nodes):
+    """Return the edges between node ids below num_nodes.
+
+    Nodes missing from the node file have no title to keep their id stable
+    by, so their edges are dropped, like those of nodes without a title.
+    """
+    known = (src < num_nodes) & (dst < num_nodes)
+    if known.all():
+        return src, dst
+    return src[known], dst[known]
+
+
+class GraphBuild:
+    """A graph in stable node ids: titles, sorted unique edges and optional PageRank."""
+
+    def __init__(self, titles, src, dst, pagerank=None, num_nodes=None):
+        self.titles = titles
+        self.src = src
+        self.dst = dst
+        self.pagerank = pagerank
+        # The size of the stable id space, including retired ids
+        self.num_nodes = titles.num_nodes if num_nodes is None else num_nodes
+
+    def live_nodes(self):
+        """Return the stable ids that currently have a title."""
+        return np.sort(self.titles.nodeids)
+
+    def graph(self):
+        return CSRGraph.from_edgelist(self.src, self.dst, num_nodes=self.num_nodes)
+
+    @classmethod
+    def from_files(cls, edgelist_csv, nodedata_csv):
+        """Start a build from wikipedia2csv output; its node ids become the stable ids."""
+        nodedata_df = load_nodetable(nodedata_csv)
+        src, dst = _known_edges(*load_edge_arrays(edgelist_csv), len(nodedata_df))
+        src, dst = dedupe_edges(src, dst)
+        return cls(TitleIndex.from_titles(nodedata_df["title"]), src, dst,
+                   num_nodes=len(nodedata_df))
+
+    def save(self, path):
+        tmp_dir = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        self.titles.save(os.path.join(tmp_dir, "titles"))
+        write_edgelist(os.path.join(tmp_dir, "edges"), self.src, self.dst, format="binary")
+        if self.pagerank is not None:
+            np.save(os.path.join(tmp_dir, _PAGERANK_FILE), self.pagerank)
+        write_meta(tmp_dir, {"num_nodes": self.num_nodes, "num_edges": len(self.src)})
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_dir, path)
+
+    @classmethod
+    def load(cls, path):
+        meta = read_meta(path)
+        if meta is None:
+            raise ValueError(f"{path} is not a graph build directory")
+        titles = TitleIndex.load(os.path.join(path, "titles"))
+        src, dst = load_edge_arrays(os.path.join(path, "edges"))
+        pagerank_path = os.path.join(path, _PAGERANK_FILE)
+        pagerank = np.load(pagerank_path, mmap_mode="r") if os.path.exists(pagerank_path) else None
+        return cls(titles, src, dst, pagerank, num_nodes=meta["num_nodes"])
+
+
+class GraphDelta:
+    """The changes between two GraphBuilds, in stable ids."""
+
+    def __init__(self, added_nodes, removed_nodes, added_src, added_dst,
+                 removed_src, removed_dst):
+        self.added_nodes = added_nodes
+        self.removed_nodes = removed_nodes
+        self.added_src = added_src
+        self.added_dst = added_dst
+        self.removed_src = removed_src
+        self.removed_dst = removed_dst
+
+    def __repr__(self):
+        return (f"GraphDelta(+{len(self.added_nodes)}/-{len(self.removed_nodes)} nodes, "
+                f"+{len(self.added_src)}/-{len(self.removed_src)} edges)")
+
+
+def update_build(prev, edgelist_csv, nodedata_csv):
+    """Return (build, delta) for a new dump, keeping the stable ids of prev.
+
+    Titles found in prev keep their ids, new titles get ids after the last id
+    of prev, and the ids of titles that disappeared are retired.
+    """
+    nodedata_df = load_nodetable(nodedata_csv)
+    present = nodedata_df["title"].notna().to_numpy()
+    titles = nodedata_df["title"][present]
+
+    # new nodeid -> stable id
+    stable = np.full(len(nodedata_df), -1, dtype=np.int32)
+    stable[present] = prev.titles.lookup(titles)
+    new_nodes = np.flatnonzero(stable < 0)
+    new_nodes = new_nodes[present[new_nodes]]
+    stable[new_nodes] = np.arange(prev.num_nodes, prev.num_nodes + len(new_nodes))
+    removed_nodes = np.setdiff1d(prev.live_nodes(), stable[present], assume_unique=True)
+    titles_index = TitleIndex.from_titles(titles, stable[present])
+
+    src, dst = _known_edges(*load_edge_arrays(edgelist_csv), len(stable))
+    src, dst = stable[src], stable[dst]
+    valid = (src >= 0) & (dst >= 0)
+    src, dst = dedupe_edges(src[valid], dst[valid])
+
+    old_keys = _edge_keys(prev.src, prev.dst)
+    new_keys = _edge_keys(src, dst)
+    added_src, added_dst = _split_keys(_missing_from(new_keys, old_keys))
+    removed_src, removed_dst = _split_keys(_missing_from(old_keys, new_keys))
+
+    build = GraphBuild(titles_index, src, dst, num_nodes=prev.num_nodes + len(new_nodes))
+    delta = GraphDelta(stable[new_nodes], removed_nodes, added_src, added_dst,
+                       removed_src, removed_dst)
+    return build, delta
+
+
+def warm_start(build, prev_pagerank):
+    """Return a PageRank start vector for build from the ranks of a previous build.
+
+    Nodes that are new in build start at the average rank.
+    """
+    x = np.zeros(build.num_nodes, dtype=np.float64)
+    prev_pagerank = np.asarray(prev_pagerank)
+    x[:len(prev_pagerank)] = prev_pagerank[:build.num_nodes]
+    new = np.arange(len(prev_pagerank), build.num_nodes)
+    x[new] = 1.0 / max(len(build.titles), 1)
+    return x
+
+
+def refresh_pagerank(build, prev_pagerank=None, telemetry=None, **kwargs):
+    """Return the PageRank of build, warm-started from prev_pagerank if given.
+
+    kwargs are passed on to pagerank_array().
+    """
+    G = build.graph()
+    nstart = None
+    if prev_pagerank is not None:
+        nstart = warm_start(build, prev_pagerank)
+        if not nstart[G.node_mask].any():
+            nstart = None
+    return pagerank_array(G, nstart=nstart, telemetry=telemetry, **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m wikigraph.incremental",
+        description="Create a graph build with stable node ids, or update one from a newer dump.",
+    )
+    parser.add_argument("edgelist_csv")
+    parser.add_argument("nodedata_csv")
+    parser.add_argument("output_build", help="directory to write the new build to")
+    parser.add_argument("--previous", help="previous build to keep node ids stable with")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    log = ConvergenceLog()
+    if args.previous:
+        prev = GraphBuild.load(args.previous)
+        build, delta = update_build(prev, args.edgelist_csv, args.nodedata_csv)
+        print(delta)
+        build.pagerank = refresh_pagerank(build, prev.pagerank, telemetry=log,
+                                          workers=args.workers)
+    else:
+        build = GraphBuild.from_files(args.edgelist_csv, args.nodedata_csv)
+        build.pagerank = refresh_pagerank(build, telemetry=log, workers=args.workers)
+    print(f"PageRank: {log}")
+    build.save(args.output_build)
+
+
+if __name__ == "__main__":
+    main()
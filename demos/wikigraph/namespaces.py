@@ -0,0 +1,127 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Integer namespace codes for pages, and namespace filters as node masks.
+
+archive/demo2.py drops pages outside of the main namespace by matching every
+title against a tuple of quoted prefixes with str.startswith(), collecting the
+matching node ids into a Python set and running isin() over both edge list
+columns. Instead, every page carries the MediaWiki namespace number (the <ns>
+element of the dump: 0 for articles, 2 for User:, 10 for Template:, ...) as an
+int16 code, and a filter is a boolean mask over node ids:
+
+    namespace = load_namespaces(nodedata_csv, nodedata_df)
+    articles, old_ids = G.subgraph(namespace_mask(namespace))
+
+The dump parser writes the codes at conversion time. For node files without
+them (such as those written by wikipedia2csv), the codes are derived once from
+the title prefixes and cached in <nodedata_csv>.namespaces/.
+"""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .edgecache import is_current, read_meta, source_info, write_meta
+from .nodetable import load_nodetable
+
+NAMESPACE_DTYPE = np.dtype("<i2")
+MAIN = 0
+
+# Title prefixes of the English Wikipedia namespaces and their aliases
+NAMESPACES = {
+    "Talk": 1,
+    "User": 2,
+    "User talk": 3,
+    "Wikipedia": 4, "Project": 4, "WP": 4,
+    "Wikipedia talk": 5, "Project talk": 5, "WT": 5,
+    "File": 6, "Image": 6,
+    "File talk": 7, "Image talk": 7,
+    "MediaWiki": 8,
+    "MediaWiki talk": 9,
+    "Template": 10, "TM": 10,
+    "Template talk": 11,
+    "Help": 12,
+    "Help talk": 13,
+    "Category": 14,
+    "Category talk": 15,
+    "Portal": 100,
+    "Portal talk": 101,
+    "Draft": 118,
+    "Draft talk": 119,
+    "TimedText": 710,
+    "TimedText talk": 711,
+    "Module": 828,
+    "Module talk": 829,
+}
+
+# Articles, categories and portals. This is deliberately stricter than the
+# "main namespace" filter of archive/demo2.py, which only removes the
+# "<Namespace> talk:" prefixes of the namespaces it lists and so keeps the
+# "Talk:" pages of articles (namespace 1); those are dropped here as well.
+ARTICLE_NAMESPACES = (MAIN, NAMESPACES["Category"], NAMESPACES["Portal"])
+
+_NAMESPACE_FILE = "namespace.npy"
+_FORMAT = 1
+
+
+def namespace_codes(titles):
+    """Return the namespace code of every title, derived from its prefix.
+
+    Titles without a known "Namespace:" prefix (and missing titles) are in
+    the main namespace. Quotes around titles, as in the node files read by
+    archive/demo2.py, are ignored.
+    """
+    titles = pd.Series(np.asarray(titles, dtype=object), copy=False)
+    prefixes = titles.str.lstrip("\"'").str.partition(":")
+    codes = prefixes[0].where(prefixes[1] == ":").map(NAMESPACES)
+    return codes.fillna(MAIN).to_numpy(NAMESPACE_DTYPE)
+
+
+def namespace_mask(namespace, keep=ARTICLE_NAMESPACES, num_nodes=None):
+    """Return a boolean mask of the node ids whose namespace is in keep.
+
+    num_nodes sets the length of the mask (e.g. to CSRGraph.num_nodes); ids
+    past the end of namespace have no title and count as the main namespace.
+    """
+    # A lookup table over all int16 codes turns the test into one gather
+    table = np.zeros(1 << 16, dtype=bool)
+    table[np.asarray(keep, dtype=NAMESPACE_DTYPE).view(np.uint16)] = True
+    mask = table[np.asarray(namespace, dtype=NAMESPACE_DTYPE).view(np.uint16)]
+    if num_nodes is not None:
+        padded = np.full(num_nodes, table[MAIN], dtype=bool)
+        padded[:min(num_nodes, len(mask))] = mask[:num_nodes]
+        mask = padded
+    return mask
+
+
+def save_namespaces(nodedata_csv, namespace, cache_dir=None):
+    """Store the namespace code of every node id of nodedata_csv next to it."""
+    cache_dir = cache_dir or f"{nodedata_csv}.namespaces"
+    tmp_dir = f"{cache_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, _NAMESPACE_FILE), np.asarray(namespace, dtype=NAMESPACE_DTYPE))
+    write_meta(tmp_dir, {"format": _FORMAT, "source": source_info(nodedata_csv)})
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+
+
+def load_namespaces(nodedata_csv, nodedata_df=None, cache_dir=None, verify=False):
+    """Return the int16 namespace code of every node id of a node metadata file.
+
+    The codes come from <nodedata_csv>.namespaces/ if it is current, and are
+    otherwise derived from the titles and cached there. nodedata_df, if given,
+    is the already-loaded dense node table (see load_nodetable()) and saves
+    reading the file again.
+    """
+    cache_dir = cache_dir or f"{nodedata_csv}.namespaces"
+    meta = read_meta(cache_dir)
+    if (meta is not None and meta.get("format") == _FORMAT
+            and is_current(meta, nodedata_csv, verify=verify)):
+        return np.load(os.path.join(cache_dir, _NAMESPACE_FILE), mmap_mode="r")
+
+    if nodedata_df is None:
+        nodedata_df = load_nodetable(nodedata_csv)
+    namespace = namespace_codes(nodedata_df["title"])
+    save_namespaces(nodedata_csv, namespace, cache_dir)
+    return namespace
@@ -0,0 +1,39 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Node tables where row position equals nodeid.
+
+The node ids written by wikipedia2csv are dense integers, but the metadata
+file lists them in hash-map order. Reindexing the table once so that row i
+holds node i turns every later join against a node-indexed result into a
+positional take (see frames.node_column()), with no hash join or sort.
+"""
+import numpy as np
+import pandas as pd
+
+
+def dense_nodetable(nodedata_df, num_nodes=None):
+    """Return nodedata_df reindexed so that row position equals "nodeid".
+
+    The result is indexed by a RangeIndex named "nodeid" covering
+    0..num_nodes - 1 (by default up to the largest nodeid). Ids with no row in
+    nodedata_df get missing values.
+    """
+    nodeids = nodedata_df["nodeid"].to_numpy()
+    if num_nodes is None:
+        num_nodes = int(nodeids.max()) + 1 if len(nodeids) else 0
+    dense_index = pd.RangeIndex(num_nodes, name="nodeid")
+    table = nodedata_df.set_index("nodeid")
+    if len(nodeids) == num_nodes and np.array_equal(nodeids, np.arange(num_nodes)):
+        table.index = dense_index
+        return table
+    return table.reindex(dense_index)
+
+
+def load_nodetable(nodedata_csv, num_nodes=None):
+    """Read a node metadata file into a dense node table (see dense_nodetable())."""
+    nodedata_df = pd.read_csv(
+        nodedata_csv,
+        sep="\t",
+        names=["nodeid", "title"],
+        dtype={"nodeid": "int32", "title": "str"},
+    )
+    return dense_nodetable(nodedata_df, num_nodes)
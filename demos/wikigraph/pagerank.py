@@ -0,0 +1,185 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""PageRank as power iteration of sparse matrix-vector products.
+
+pagerank_array() computes exactly what nx.pagerank() computes (same handling
+of dangling nodes, personalization, nstart and the len(G) * tol convergence
+test), but runs each iteration as one SciPy CSR SpMV over the reversed
+adjacency and returns a NumPy array indexed by node id instead of a dict.
+
+Pass a ConvergenceLog as telemetry to record the residual and wall time of
+every iteration:
+
+    log = ConvergenceLog()
+    pr = pagerank_array(G, telemetry=log)
+    print(log.to_frame())
+"""
+import time
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from .csr import CSRGraph, node_values
+from .parallel import RowBlockMatrix
+
+
+class ConvergenceLog:
+    """Per-iteration residual and timing of an iterative solver."""
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.residuals = []
+        self.seconds = []
+        self.converged = False
+        self.top_k_stable = False
+
+    def record(self, iteration, residual, seconds):
+        self.residuals.append(residual)
+        self.seconds.append(seconds)
+        if self.verbose:
+            print(f"iteration {iteration:3d}: residual={residual:.3e} ({seconds:.3f}s)",
+                  flush=True)
+
+    @property
+    def iterations(self):
+        return len(self.residuals)
+
+    @property
+    def total_seconds(self):
+        return sum(self.seconds)
+
+    def to_frame(self):
+        return pd.DataFrame({
+            "iteration": np.arange(1, self.iterations + 1),
+            "residual": self.residuals,
+            "seconds": self.seconds,
+        })
+
+    def __repr__(self):
+        if self.converged:
+            state = "converged"
+        elif self.top_k_stable:
+            state = "stopped with a stable top k"
+        else:
+            state = "not converged"
+        return (f"ConvergenceLog({self.iterations} iterations, {state}, "
+                f"{self.total_seconds:.3f}s)")
+
+
+class TopKTracker:
+    """Detects when the k highest-ranked nodes of an iterate stop changing.
+
+    update() is called with every iterate and returns True once the top k
+    node ids, in order, have been the same for patience consecutive
+    iterations after the first.
+    """
+
+    def __init__(self, k, patience=3):
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.k = k
+        self.patience = patience
+        self._top = None
+        self._unchanged = 0
+
+    def top(self, x):
+        """Return the ids of the k largest values of x, largest first."""
+        k = min(self.k, len(x))
+        top = np.argpartition(x, len(x) - k)[len(x) - k:]
+        # Ties are broken by node id so that the order is reproducible
+        return top[np.lexsort((top, -x[top]))]
+
+    def update(self, x):
+        top = self.top(x)
+        if self._top is not None and np.array_equal(top, self._top):
+            self._unchanged += 1
+        else:
+            self._unchanged = 0
+        self._top = top
+        return self._unchanged >= self.patience
+
+
+def as_graph(G, source="src", target="dst"):
+    """Return G as a CSRGraph, building one if G is an edge list DataFrame."""
+    if isinstance(G, CSRGraph):
+        return G
+    return CSRGraph.from_pandas_edgelist(G, source=source, target=target)
+
+
+def pagerank_array(G, alpha=0.85, personalization=None, max_iter=100, tol=1.0e-6,
+                   nstart=None, dangling=None, telemetry=None, workers=1,
+                   top_k=None, patience=3):
+    """Return the PageRank of every node id as a float64 array.
+
+    G is a CSRGraph or an edge list DataFrame with "src" and "dst" columns.
+    personalization, nstart and dangling may be {node: value} dicts as for
+    nx.pagerank(), or arrays indexed by node id. Ids that are not nodes of the
+    graph get a rank of 0 (see CSRGraph.node_mask). workers > 1 runs the SpMV
+    of each iteration on that many threads (None uses every available core).
+
+    nstart may be a previous result, e.g. the PageRank of the graph before a
+    filter was applied, which typically saves most of the iterations.
+
+    With top_k, the iteration also stops (without raising) once the ids of the
+    top_k highest-ranked nodes, in order, have not changed for patience
+    iterations. The ranks are then less accurate than tol asks for, but their
+    top_k ordering has settled, which is all a "top 25" table needs.
+
+    Raises nx.PowerIterationFailedConvergence if the iteration does not
+    converge within max_iter iterations.
+    """
+    G = as_graph(G)
+    N = len(G)
+    if N == 0:
+        return np.zeros(G.num_nodes, dtype=np.float64)
+
+    out_degree = G.out_degree()
+    inv_degree = np.zeros(G.num_nodes, dtype=np.float64)
+    np.divide(1.0, out_degree, out=inv_degree, where=out_degree != 0)
+    is_dangling = np.flatnonzero((out_degree == 0) & G.node_mask)
+
+    uniform = np.where(G.node_mask, 1.0 / N, 0.0)
+    if nstart is None:
+        x = uniform
+    else:
+        x = node_values(G, nstart, "nstart")
+        x /= x.sum()
+    if personalization is None:
+        p = uniform
+    else:
+        p = node_values(G, personalization, "personalization")
+        if p.sum() == 0:
+            raise ZeroDivisionError
+        p /= p.sum()
+    if dangling is None:
+        dangling_weights = p
+    else:
+        dangling_weights = node_values(G, dangling, "dangling")
+        dangling_weights /= dangling_weights.sum()
+
+    teleport = (1 - alpha) * p
+    scaled = np.empty_like(x)
+    tracker = TopKTracker(top_k, patience) if top_k else None
+    # x @ A is computed as a row-wise SpMV over the reversed graph (CSC of A),
+    # with the 1 / out_degree normalization applied to x instead of to A.
+    with RowBlockMatrix.from_graph(G.reverse(), workers) as AT:
+        for i in range(1, max_iter + 1):
+            st = time.perf_counter()
+            xlast = x
+            np.multiply(xlast, inv_degree, out=scaled)
+            x = AT.matvec(scaled)
+            x += xlast[is_dangling].sum() * dangling_weights
+            x *= alpha
+            x += teleport
+            err = np.absolute(x - xlast).sum()
+            if telemetry is not None:
+                telemetry.record(i, float(err), time.perf_counter() - st)
+            if err < N * tol:
+                if telemetry is not None:
+                    telemetry.converged = True
+                return x
+            if tracker is not None and tracker.update(x):
+                if telemetry is not None:
+                    telemetry.top_k_stable = True
+                return x
+    raise nx.PowerIterationFailedConvergence(max_iter)
@@ -0,0 +1,247 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""A pipeline runner that caches stage results by the hash of their inputs.
+
+Every stage of a Pipeline declares what its result depends on:
+
+    files    input files, fingerprinted by their BLAKE2b digest
+    stages   the results of earlier stages
+    params   JSON-compatible parameters, such as the PageRank alpha and tol
+             (NumPy scalars are keyed as Python numbers, other values by repr)
+
+and the code of the stage function itself. The hash of all of these is the
+key of the result, which is stored on disk in <cache_dir>/<stage>/<key>/ as
+one .npy file per column (strings as UTF-8 with offsets) and loaded
+memory-mapped. A stage whose key has a stored result is not run at all, so
+after a change to, say, the report at the end of a script, only the stages
+downstream of the change run again:
+
+    pipeline = Pipeline("demo.stages", profiler)
+    pagerank = pipeline.run("pagerank", run_pagerank, files={"edgelist_csv": edgelist_csv},
+                            params={"alpha": 0.85, "tol": 1e-6})
+    totals = pipeline.run("editor totals", sum_by_editor, stages={"pagerank": "pagerank"})
+
+Files, stage results and params are all passed to the stage function as
+keyword arguments. A stage result may be a NumPy array, a dict of arrays or a
+DataFrame. Only the function's own code is hashed, not the functions it calls;
+pass a "version" param to invalidate results after changing those. Loading a
+result marks it as used, and only the keep most recently used results of each
+stage are kept.
+"""
+import hashlib
+import json
+import os
+import shutil
+from contextlib import nullcontext
+from time import time_ns
+
+import numpy as np
+import pandas as pd
+
+from .edgecache import META_FILE, file_digest, read_meta, write_meta
+
+STAGE_FORMAT = 1
+# Results kept per stage, the most recently used
+DEFAULT_KEEP = 4
+_FILES_MEMO = "files.json"
+_INDEX_COLUMN = "__index__"
+
+
+def _code_hash(func):
+    digest = hashlib.blake2b(digest_size=16)
+
+    def add(code):
+        digest.update(code.co_code)
+        digest.update(repr(code.co_names).encode("utf-8"))
+        for const in code.co_consts:
+            # The repr of nested code objects holds their memory address
+            if hasattr(const, "co_code"):
+                add(const)
+            else:
+                digest.update(repr(const).encode("utf-8"))
+
+    add(func.__code__)
+    return digest.hexdigest()
+
+
+def _json_params(params):
+    """Return params as keyed and stored: NumPy scalars as Python numbers,
+    values that JSON cannot encode as their repr."""
+    def encode(value):
+        return value.item() if isinstance(value, np.generic) else repr(value)
+
+    return json.loads(json.dumps(params, default=encode))
+
+
+def _save_column(path, name, values):
+    values = np.asarray(values)
+    if values.dtype != object:
+        np.save(os.path.join(path, f"{name}.npy"), values)
+        return "array"
+    # Strings, with None for missing values
+    present = pd.notna(values)
+    encoded = [s.encode("utf-8") if ok else b"" for s, ok in zip(values.tolist(), present)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    with open(os.path.join(path, f"{name}.utf8"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(path, f"{name}.offsets.npy"), offsets)
+    np.save(os.path.join(path, f"{name}.present.npy"), present)
+    return "strings"
+
+
+def _load_column(path, name, kind):
+    if kind == "array":
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+    with open(os.path.join(path, f"{name}.utf8"), "rb") as f:
+        buffer = f.read()
+    offsets = np.load(os.path.join(path, f"{name}.offsets.npy")).tolist()
+    present = np.load(os.path.join(path, f"{name}.present.npy")).tolist()
+    return np.array([buffer[start:stop].decode("utf-8") if ok else None
+                     for start, stop, ok in zip(offsets[:-1], offsets[1:], present)],
+                    dtype=object)
+
+
+def save_result(path, result):
+    """Store a stage result in the directory path and return its metadata."""
+    if isinstance(result, pd.DataFrame):
+        kind = "frame"
+        columns = {str(name): result[name].to_numpy() for name in result.columns}
+        if not result.index.equals(pd.RangeIndex(len(result))):
+            columns[_INDEX_COLUMN] = result.index.to_numpy()
+    elif isinstance(result, dict):
+        kind = "dict"
+        columns = result
+    else:
+        kind = "array"
+        columns = {"values": result}
+    os.makedirs(path)
+    column_kinds = {name: _save_column(path, name, values) for name, values in columns.items()}
+    return {"kind": kind, "columns": column_kinds,
+            "nbytes": sum(entry.stat().st_size for entry in os.scandir(path))}
+
+
+def load_result(path, meta):
+    """Return a stage result stored by save_result(), with arrays memory-mapped."""
+    columns = {name: _load_column(path, name, kind) for name, kind in meta["columns"].items()}
+    if meta["kind"] == "array":
+        return columns["values"]
+    if meta["kind"] == "dict":
+        return columns
+    index = columns.pop(_INDEX_COLUMN, None)
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+class Pipeline:
+    """Runs stages, reusing results stored under cache_dir (see the module docstring).
+
+    With cache_dir=None every stage runs and nothing is stored. If profiler
+    (a profiling.Profiler) is given, every stage is measured as a profiler
+    stage, whether it runs or is loaded.
+    """
+
+    def __init__(self, cache_dir, profiler=None, keep=DEFAULT_KEEP):
+        self.cache_dir = cache_dir
+        self.profiler = profiler
+        self.keep = keep
+        self.keys = {}
+        self.results = {}
+        self._digests = None
+
+    def _file_digest(self, path):
+        """Return the digest of a file, only reading it again after it changed."""
+        memo_path = os.path.join(self.cache_dir, _FILES_MEMO)
+        if self._digests is None:
+            try:
+                with open(memo_path) as f:
+                    self._digests = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._digests = {}
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        entry = self._digests.get(path)
+        if entry is None or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+            entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "blake2b": file_digest(path)}
+            self._digests[path] = entry
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{memo_path}.tmp-{os.getpid()}"
+            with open(tmp_path, "w") as f:
+                json.dump(self._digests, f, indent=1)
+            os.replace(tmp_path, memo_path)
+        return entry["blake2b"]
+
+    def key(self, name, func, files=None, stages=None, params=None):
+        """Return the hex key of a stage result; the stages must have run already."""
+        description = {
+            "stage": name,
+            "format": STAGE_FORMAT,
+            "code": _code_hash(func),
+            "files": {arg: self._file_digest(path) for arg, path in (files or {}).items()},
+            "stages": {arg: self.keys[stage] for arg, stage in (stages or {}).items()},
+            "params": _json_params(params or {}),
+        }
+        encoded = json.dumps(description, sort_keys=True).encode("utf-8")
+        return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+    def _stage_dir(self, name):
+        return os.path.join(self.cache_dir, name.replace(os.sep, "_"))
+
+    def _evict(self, name):
+        """Remove all but the self.keep most recently used results of a stage.
+
+        The mtime of a result's metadata file is its last use, as in GraphCache.
+        """
+        entries = []
+        for entry in os.scandir(self._stage_dir(name)):
+            if entry.is_dir() and ".tmp-" not in entry.name:
+                try:
+                    last_used = os.stat(os.path.join(entry.path, META_FILE)).st_mtime_ns
+                except FileNotFoundError:
+                    last_used = 0
+                entries.append((last_used, entry.path))
+        for _, path in sorted(entries, reverse=True)[self.keep:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def run(self, name, func, files=None, stages=None, params=None, message=None):
+        """Return the result of func for the given inputs, from the cache if possible.
+
+        files maps argument names to input paths, stages maps argument names
+        to the names of earlier stages, and params maps argument names to
+        values. message is printed by the profiler (default: the stage name).
+        """
+        files, stages, params = files or {}, stages or {}, params or {}
+        with self.profiler.stage(message or name) if self.profiler else nullcontext():
+            result = self._run(name, func, files, stages, params)
+        self.results[name] = result
+        return result
+
+    def _run(self, name, func, files, stages, params):
+        kwargs = {**files, **{arg: self.results[stage] for arg, stage in stages.items()}, **params}
+        if self.cache_dir is None:
+            self.keys[name] = None
+            return func(**kwargs)
+
+        key = self.key(name, func, files, stages, params)
+        self.keys[name] = key
+        path = os.path.join(self._stage_dir(name), key)
+        meta = read_meta(path)
+        if meta is not None and meta.get("format") == STAGE_FORMAT:
+            print(f"Loaded the stored result {key[:12]}", flush=True)
+            os.utime(os.path.join(path, META_FILE))
+            return load_result(path, meta)
+
+        # Encoded before running func, so a result is never lost to its metadata
+        stored_params = _json_params(params)
+        result = func(**kwargs)
+        tmp_dir = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        try:
+            meta = save_result(tmp_dir, result)
+            write_meta(tmp_dir, {"format": STAGE_FORMAT, "stage": name, "created": time_ns(),
+                                 "params": stored_params, **meta})
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_dir, path)
+        self._evict(name)
+        return load_result(path, read_meta(path))
@@ -0,0 +1,299 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Per-stage instrumentation for the demo pipelines.
+
+A Profiler replaces the Timer class the demos used to copy around. Every stage
+prints its start message and wall time as Timer did, and also records:
+
+    wall_seconds      elapsed time
+    cpu_seconds       user + system CPU time of the process (above wall_seconds
+                      when several threads are busy)
+    peak_rss_delta    how far the peak resident set size rose above the RSS at
+                      the start of the stage, in bytes
+    bytes_read        bytes read by the process through read() calls (Linux
+                      only; pages of memory-mapped files are not counted)
+    rows              rows or edges processed, if the stage sets it
+
+Stages nest; a nested stage is recorded under "parent/child" and printed
+indented:
+
+    profiler = Profiler()
+    with profiler.stage("Read the edge list") as stage:
+        edgelist_df = load_edgelist(edgelist_csv)
+        stage.rows = len(edgelist_df)
+    profiler.finish()   # prints the total, and writes the report if requested
+
+The report is written to the path in the WIKIGRAPH_PROFILE environment variable
+(or passed to Profiler), as JSON or, for a .csv path, as CSV. Two reports are
+compared stage by stage with:
+
+    python -m wikigraph.profiling before.json after.json
+
+On Linux the peak RSS of each stage is measured exactly by resetting the
+kernel's high-water mark (/proc/self/clear_refs) when a stage starts. Where
+that is not possible, the process-wide peak (resource.getrusage) is used, so a
+stage that stays below an earlier peak shows no rise.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+REPORT_ENV = "WIKIGRAPH_PROFILE"
+FIELDS = ("stage", "depth", "wall_seconds", "cpu_seconds", "peak_rss_delta", "bytes_read", "rows")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _read_proc(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _rss():
+    """Return the current resident set size in bytes, or None if unknown."""
+    statm = _read_proc("/proc/self/statm")
+    if statm is None:
+        return None
+    return int(statm.split()[1]) * _PAGE_SIZE
+
+
+def _peak_rss():
+    """Return the peak resident set size in bytes (since the last reset), or None."""
+    status = _read_proc("/proc/self/status")
+    if status is not None:
+        for line in status.splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _reset_peak_rss():
+    """Reset the peak RSS to the current RSS, returning False if not supported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _bytes_read():
+    io = _read_proc("/proc/self/io")
+    if io is None:
+        return None
+    for line in io.splitlines():
+        if line.startswith("rchar:"):
+            return int(line.split()[1])
+    return None
+
+
+def _delta(start, stop):
+    return None if start is None or stop is None else stop - start
+
+
+class Stage:
+    """The measurements of one stage; set rows while the stage runs."""
+
+    def __init__(self, name, path, depth):
+        self.name = name
+        self.path = path
+        self.depth = depth
+        self.rows = None
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.peak_rss_delta = None
+        self.bytes_read = None
+        self._start = None
+        self._peak = None
+
+    def add_rows(self, rows):
+        self.rows = (self.rows or 0) + int(rows)
+
+    def to_dict(self):
+        return {
+            "stage": self.path,
+            "depth": self.depth,
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "peak_rss_delta": self.peak_rss_delta,
+            "bytes_read": self.bytes_read,
+            "rows": self.rows,
+        }
+
+
+class _StageContext:
+    def __init__(self, profiler, stage):
+        self.profiler = profiler
+        self.stage = stage
+
+    def __enter__(self):
+        self.profiler._enter(self.stage)
+        return self.stage
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler._exit(self.stage)
+
+
+class Profiler:
+    """Records nested pipeline stages and reports them (see the module docstring)."""
+
+    def __init__(self, report_path=None, verbose=True):
+        self.report_path = report_path or os.environ.get(REPORT_ENV)
+        self.verbose = verbose
+        self.stages = []
+        self.started = datetime.now(timezone.utc)
+        self._active = []
+        self._paths = set()
+        self._exact_peak = None
+
+    def stage(self, name, rows=None):
+        """Return a context manager that measures a stage and yields its Stage."""
+        parent = self._active[-1].path + "/" if self._active else ""
+        path = f"{parent}{name}"
+        # Repeated stage names are numbered, so reports can be compared by path
+        number = 2
+        while path in self._paths:
+            path = f"{parent}{name} #{number}"
+            number += 1
+        self._paths.add(path)
+        stage = Stage(name, path, len(self._active))
+        stage.rows = rows
+        return _StageContext(self, stage)
+
+    def _enter(self, stage):
+        if self.verbose and stage.name:
+            print(f"\n{'  ' * stage.depth}{stage.name}...", flush=True)
+        if self._active:
+            # The parent's peak so far would be lost by the reset below
+            parent = self._active[-1]
+            parent._peak = max(filter(None, (parent._peak, _peak_rss())), default=None)
+        if self._exact_peak is None:
+            self._exact_peak = _reset_peak_rss()
+        elif self._exact_peak:
+            _reset_peak_rss()
+        rss = _rss() if self._exact_peak else _peak_rss()
+        self._active.append(stage)
+        stage._start = (time.perf_counter(), time.process_time(), rss, _bytes_read())
+
+    def _exit(self, stage):
+        wall, cpu, rss, bytes_read = stage._start
+        stage.wall_seconds = time.perf_counter() - wall
+        stage.cpu_seconds = time.process_time() - cpu
+        stage.bytes_read = _delta(bytes_read, _bytes_read())
+        stage._peak = max(filter(None, (stage._peak, _peak_rss())), default=None)
+        stage.peak_rss_delta = _delta(rss, stage._peak)
+        if stage.peak_rss_delta is not None:
+            stage.peak_rss_delta = max(stage.peak_rss_delta, 0)
+        self._active.pop()
+        if self._active:
+            parent = self._active[-1]
+            parent._peak = max(filter(None, (parent._peak, stage._peak)), default=None)
+        self.stages.append(stage)
+        if self.verbose:
+            print(f"{'  ' * stage.depth}Done in: {timedelta(seconds=stage.wall_seconds)}", flush=True)
+
+    @property
+    def total_seconds(self):
+        return sum(stage.wall_seconds for stage in self.stages if stage.depth == 0)
+
+    def to_frame(self):
+        """Return the finished stages as a DataFrame, in the order they started."""
+        stages = sorted(self.stages, key=lambda stage: stage._start[0])
+        frame = pd.DataFrame([stage.to_dict() for stage in stages], columns=list(FIELDS))
+        return frame.astype({"peak_rss_delta": "Int64", "bytes_read": "Int64", "rows": "Int64"})
+
+    def save(self, path):
+        """Write the report to path, as CSV if it ends in .csv and as JSON otherwise."""
+        if path.endswith(".csv"):
+            self.to_frame().to_csv(path, index=False)
+            return
+        report = {
+            "started": self.started.isoformat(),
+            "argv": sys.argv,
+            "total_seconds": self.total_seconds,
+            # to_json() writes missing measurements as null
+            "stages": json.loads(self.to_frame().to_json(orient="records")),
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=1)
+
+    def print_total(self):
+        print(f"Total time: {timedelta(seconds=self.total_seconds)}", flush=True)
+
+    def finish(self):
+        """Print the total time and write the report, if a report path is set."""
+        self.print_total()
+        if self.report_path:
+            self.save(self.report_path)
+
+
+def load_report(path):
+    """Return the stages of a report written by Profiler.save() as a DataFrame."""
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    with open(path) as f:
+        return pd.DataFrame(json.load(f)["stages"], columns=list(FIELDS))
+
+
+def compare_reports(before, after):
+    """Return a DataFrame comparing two reports stage by stage.
+
+    Stages are matched by path and listed in the order of the after run,
+    followed by stages only in the before run. The ratio columns are after /
+    before, so a wall_ratio of 1.5 means the stage took 50% longer.
+    """
+    merged = pd.merge(
+        before.drop(columns="depth"), after.drop(columns="depth"),
+        on="stage", how="outer", suffixes=("_before", "_after"),
+    )
+    order = pd.Index(after["stage"]).append(pd.Index(before["stage"])).drop_duplicates()
+    merged = merged.set_index("stage").reindex(order).reset_index()
+    merged["wall_ratio"] = merged["wall_seconds_after"] / merged["wall_seconds_before"]
+    merged["cpu_ratio"] = merged["cpu_seconds_after"] / merged["cpu_seconds_before"]
+    merged["peak_rss_change"] = merged["peak_rss_delta_after"] - merged["peak_rss_delta_before"]
+    return merged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m wikigraph.profiling",
+        description="Compare two stage reports written by a Profiler.",
+    )
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=1.1,
+                        help="flag stages whose wall time grew by more than this factor")
+    parser.add_argument("--min-seconds", type=float, default=0.1,
+                        help="do not flag stages shorter than this in both runs")
+    args = parser.parse_args(argv)
+
+    diff = compare_reports(load_report(args.before), load_report(args.after))
+    long_enough = diff[["wall_seconds_before", "wall_seconds_after"]].max(axis=1) >= args.min_seconds
+    diff["regressed"] = (diff["wall_ratio"] > args.threshold) & long_enough
+    columns = ["stage", "wall_seconds_before", "wall_seconds_after", "wall_ratio",
+               "cpu_ratio", "peak_rss_change", "regressed"]
+    with pd.option_context("display.max_colwidth", 60, "display.width", 200):
+        print(diff[columns].to_string(index=False))
+    regressed = diff.loc[diff["regressed"], "stage"].tolist()
+    print(f"\n{len(regressed)} of {len(diff)} stages regressed by more than {args.threshold}x")
+    for stage in regressed:
+        print(f"  {stage}")
+
+
+if __name__ == "__main__":
+    main()
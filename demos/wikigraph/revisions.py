@@ -0,0 +1,281 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Dictionary-encoded revision history tables.
+
+Reading the revisions file with pd.read_csv(..., dtype="str") holds every
+title and editor name of every revision as a Python string, although most of
+them are repeats, and the "most influential editors" groupby then hashes all
+those strings again. The first call to load_revisions() streams the file once
+into a cache next to it:
+
+    <revisions_csv>.revisions/
+        title.i32, editor.i32   the title and editor code of every revision,
+                                as raw int32 columns (see edgecache)
+        titles/                 TitleIndex of the distinct titles <-> title code
+        editors/                TitleIndex of the distinct editors <-> editor
+                                code, with codes in editor name order
+
+Later calls memory-map the columns. The title codes are mapped to node ids by
+looking up each distinct title (by its stored hashes, not its string) in the
+title index of the node file, so every revision costs 8 bytes in memory and
+per-editor sums become a bincount over the editor codes:
+
+    title_index = load_title_index(nodedata_csv)
+    revisions = load_revisions(revisions_csv, title_index)
+    influence = revisions.editor_influence(pagerank)
+
+For histories too large to hold even that, stream_editor_totals() computes
+the per-editor sums directly from the file, one chunk at a time, with chunks
+sized to stay within a memory budget. Only the distinct editors of counted
+revisions and their running sums are kept between chunks.
+"""
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .bots import editor_bot_flags
+from .edgecache import (
+    EDGE_DTYPE, _HashingReader, is_current, map_column, read_meta, source_info, write_columns,
+)
+from .frames import node_column
+from .stringtable import StringTable, grow_array
+from .titleindex import TitleIndex
+
+REVISIONS_FORMAT = 1
+DEFAULT_CHUNKSIZE = 10_000_000
+DEFAULT_MEMORY_BUDGET = 1 << 30
+_COLUMNS = ("title", "editor")
+_READ_OPTIONS = {"sep": "\t", "names": list(_COLUMNS), "dtype": "str"}
+# Rows of the first streamed chunk, before the size of a row has been measured
+_FIRST_CHUNK_ROWS = 100_000
+# Temporaries made while processing a chunk, relative to the size of the chunk
+_CHUNK_OVERHEAD = 3
+# Once the per-editor state fills the budget, chunks do not get any smaller
+_MIN_CHUNK_ROWS = 10_000
+
+
+def read_revision_chunks(revisions_csv, chunksize=DEFAULT_CHUNKSIZE, digest=None):
+    """Yield the revisions file as DataFrames of at most chunksize rows.
+
+    The rows are parsed exactly as demo.py reads the whole file. If digest (a
+    hashlib object) is given, every byte of the file is fed through it.
+    """
+    with open(revisions_csv, "rb") as raw:
+        f = raw if digest is None else _HashingReader(raw, digest)
+        yield from pd.read_csv(f, chunksize=chunksize, **_READ_OPTIONS)
+        if digest is not None:
+            while block := raw.read(1 << 24):
+                digest.update(block)
+
+
+def _name_order(table):
+    """Return the strings of a StringTable and the rank of each id in name order.
+
+    Name order is the order of the groups of a groupby on the strings.
+    """
+    names = np.array(table.strings(np.arange(len(table))), dtype=object)
+    rank = np.empty(len(names), dtype=EDGE_DTYPE)
+    rank[np.argsort(names, kind="stable")] = np.arange(len(names), dtype=EDGE_DTYPE)
+    return names, rank
+
+
+def influence_frame(editors, totals, name="pagerank", editor_mask=None):
+    """Return a DataFrame of per-editor sums from (sums, counts) over editor codes.
+
+    This is the result of groupby("editor").sum().reset_index() on the
+    revisions merged with the values: one row per editor with at least one
+    counted revision, in editor name order. editors is the TitleIndex of
+    editor names <-> codes. editor_mask (a boolean array over editor codes,
+    such as ~bot_mask()) selects rows of that frame, keeping their index
+    labels, and only the selected names are decoded.
+    """
+    sums, counts = totals
+    codes = np.flatnonzero(counts)
+    labels = np.arange(len(codes))
+    if editor_mask is not None:
+        keep = np.asarray(editor_mask)[codes]
+        codes, labels = codes[keep], labels[keep]
+    return pd.DataFrame({"editor": editors.titles(codes), name: sums[codes]}, index=labels)
+
+
+def _add_codes(table, values):
+    """Return the StringTable ids of a column of strings, -1 for missing values."""
+    present = values.notna().to_numpy()
+    codes = np.full(len(values), -1, dtype=EDGE_DTYPE)
+    codes[present] = table.add(values.to_numpy(dtype=object)[present])
+    return codes
+
+
+class Revisions:
+    """The revisions of a history file as node ids and editor codes.
+
+    nodeid[i] is the node id of the page of revision i (-1 if the page is not
+    in the node file) and editor[i] its editor code (-1 if missing). editors
+    maps editor names to codes and back; codes are in editor name order.
+    cache_dir, if set, is where per-editor results such as bot flags are
+    cached.
+    """
+
+    def __init__(self, nodeid, editor, editors, cache_dir=None):
+        self.nodeid = nodeid
+        self.editor = editor
+        self.editors = editors
+        self.cache_dir = cache_dir
+
+    def __len__(self):
+        return len(self.nodeid)
+
+    @property
+    def num_editors(self):
+        return self.editors.num_nodes
+
+    def editor_totals(self, values, chunksize=DEFAULT_CHUNKSIZE):
+        """Return (sums, counts) of values[nodeid] over the revisions of each editor code.
+
+        values is indexed by node id. Revisions of pages without a value (not
+        in the node file, or NaN like the nodes missing from a graph) are not
+        counted, just like the rows dropped by merging on "nodeid".
+        """
+        values = np.asarray(values, dtype=np.float64)
+        sums = np.zeros(self.num_editors, dtype=np.float64)
+        counts = np.zeros(self.num_editors, dtype=np.int64)
+        # Chunked, so the temporaries stay small next to the memory-mapped columns
+        for start in range(0, len(self), chunksize):
+            weights = node_column(values, self.nodeid[start:start + chunksize])
+            editor = self.editor[start:start + chunksize]
+            valid = ~np.isnan(weights) & (editor >= 0)
+            editor = editor[valid]
+            sums += np.bincount(editor, weights=weights[valid], minlength=self.num_editors)
+            counts += np.bincount(editor, minlength=self.num_editors)
+        return sums, counts
+
+    def bot_mask(self, rules=None):
+        """Return a boolean array flagging the editor codes of bots (see bots.BotRules)."""
+        cache_dir = self.cache_dir and os.path.join(self.cache_dir, "bots")
+        return editor_bot_flags(self.editors, rules, cache_dir)
+
+    def influence_frame(self, totals, name="pagerank", editor_mask=None):
+        """Return a DataFrame of the (sums, counts) of editor_totals(), see influence_frame()."""
+        return influence_frame(self.editors, totals, name, editor_mask)
+
+    def editor_influence(self, values, name="pagerank", editor_mask=None):
+        """Return the sum of values over the pages each editor revised as a DataFrame.
+
+        See editor_totals() and influence_frame().
+        """
+        return self.influence_frame(self.editor_totals(values), name, editor_mask)
+
+
+def convert_revisions(revisions_csv, cache_dir=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Parse the revisions file once into dictionary-encoded columns in cache_dir.
+
+    The file is read in chunks of chunksize rows, so memory use is bounded by
+    the chunk size and the number of distinct titles and editors. Returns the
+    new metadata dict.
+    """
+    cache_dir = cache_dir or f"{revisions_csv}.revisions"
+    tmp_dir = f"{cache_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    tables = {name: StringTable() for name in _COLUMNS}
+    digest = hashlib.blake2b()
+    num_rows = 0
+    with open(os.path.join(tmp_dir, "title.i32"), "wb") as title_out, \
+         open(os.path.join(tmp_dir, "editor.i32"), "wb") as editor_out:
+        for chunk in read_revision_chunks(revisions_csv, chunksize, digest):
+            _add_codes(tables["title"], chunk["title"]).tofile(title_out)
+            _add_codes(tables["editor"], chunk["editor"]).tofile(editor_out)
+            num_rows += len(chunk)
+
+    titles = tables["title"]
+    titles.to_title_index(np.arange(len(titles))).save(os.path.join(tmp_dir, "titles"))
+
+    # Renumber the editors in name order, which is the order of a groupby
+    editor_names, rank = _name_order(tables["editor"])
+    TitleIndex.from_titles(editor_names, rank).save(os.path.join(tmp_dir, "editors"))
+    if num_rows:
+        editor = np.memmap(os.path.join(tmp_dir, "editor.i32"), dtype=EDGE_DTYPE, mode="r+")
+        for start in range(0, num_rows, chunksize):
+            codes = editor[start:start + chunksize]
+            known = codes >= 0
+            codes[known] = rank[codes[known]]
+        editor.flush()
+        del editor
+
+    meta = write_columns(tmp_dir, _COLUMNS, num_rows, {
+        "format": REVISIONS_FORMAT,
+        "num_titles": len(titles),
+        "num_editors": len(editor_names),
+        "source": source_info(revisions_csv, digest.hexdigest()),
+    })
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    return meta
+
+
+def load_revisions(revisions_csv, title_index, cache_dir=None, verify=False):
+    """Return the Revisions of a revisions file, with titles resolved by title_index.
+
+    The file is only parsed if <revisions_csv>.revisions/ is missing or out of
+    date (see convert_revisions()).
+    """
+    cache_dir = cache_dir or f"{revisions_csv}.revisions"
+    meta = read_meta(cache_dir)
+    if not (meta is not None and meta.get("format") == REVISIONS_FORMAT
+            and is_current(meta, revisions_csv, verify=verify)):
+        meta = convert_revisions(revisions_csv, cache_dir)
+    num_rows = meta["num_rows"]
+
+    titles = TitleIndex.load(os.path.join(cache_dir, "titles"))
+    # title code -> nodeid, with one extra entry so that code -1 maps to -1
+    nodeid_of = np.full(meta["num_titles"] + 1, -1, dtype=EDGE_DTYPE)
+    nodeid_of[titles.nodeids] = title_index.lookup_hashes(titles.hash1, titles.hash2)
+    nodeid = nodeid_of[map_column(cache_dir, "title", num_rows)]
+
+    editors = TitleIndex.load(os.path.join(cache_dir, "editors"))
+    return Revisions(nodeid, map_column(cache_dir, "editor", num_rows), editors, cache_dir)
+
+
+def stream_editor_totals(revisions_csv, title_index, values, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """Return (editors, (sums, counts)) of values over a revisions file, read in chunks.
+
+    This is Revisions.editor_totals() without a cache: values is indexed by
+    node id, titles are resolved with title_index, and editors is a TitleIndex
+    of the editors with at least one counted revision, with codes in name
+    order. The chunks are sized from the measured memory use of the rows read
+    so far, so that a chunk and its temporaries, plus the running per-editor
+    state, stay within about memory_budget bytes (values and title_index are
+    not counted; load the title index memory-mapped).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    table = StringTable()
+    sums = np.zeros(0, dtype=np.float64)
+    counts = np.zeros(0, dtype=np.int64)
+    rows = _FIRST_CHUNK_ROWS
+    with open(revisions_csv, "rb") as f:
+        reader = pd.read_csv(f, iterator=True, **_READ_OPTIONS)
+        while True:
+            try:
+                chunk = reader.get_chunk(rows)
+            except StopIteration:
+                break
+            weights = node_column(values, title_index.lookup(chunk["title"]))
+            valid = ~np.isnan(weights) & chunk["editor"].notna().to_numpy()
+            editor = table.add(chunk["editor"].to_numpy(dtype=object)[valid])
+            sums = grow_array(sums, len(table))
+            counts = grow_array(counts, len(table))
+            sums += np.bincount(editor, weights=weights[valid], minlength=len(sums))
+            counts += np.bincount(editor, minlength=len(counts))
+
+            row_bytes = _CHUNK_OVERHEAD * chunk.memory_usage(index=False, deep=True).sum() / len(chunk)
+            state_bytes = table.nbytes + sums.nbytes + counts.nbytes
+            rows = max(int((memory_budget - state_bytes) // max(row_bytes, 1)), _MIN_CHUNK_ROWS)
+
+    names, rank = _name_order(table)
+    totals = np.zeros(len(names), dtype=np.float64), np.zeros(len(names), dtype=np.int64)
+    totals[0][rank] = sums[:len(names)]
+    totals[1][rank] = counts[:len(names)]
+    return TitleIndex.from_titles(names, rank), totals
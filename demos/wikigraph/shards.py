@@ -0,0 +1,480 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Out-of-core graphs stored as source-range shards.
+
+A CSRGraph needs the whole adjacency (and, for PageRank, its reverse) in
+memory, and building it sorts every edge at once. For edge lists larger than
+RAM, load_sharded_graph() splits the graph by source node id into shards that
+each fit in a memory budget, and stores them next to the edge list:
+
+    <edgelist_csv>.shards/
+        out_degree.npy, node_mask.npy   per node id
+        shard-00000/
+            indptr.npy      int64 row offsets of the shard's source ids
+            indices.i32     int32 successor ids (see edgecache), sorted and
+                            deduplicated within each row
+        shard-00001/
+        ...
+
+Each shard is the CSR slice of rows start:stop of the full graph, and is
+memory-mapped only while it is processed. sharded_pagerank(),
+sharded_hits() and sharded_bfs() stream over the shards once per iteration
+(or BFS level), so the resident working set is the per-node vectors (the rank
+vectors, degrees and node mask) plus one shard:
+
+    G = load_sharded_graph(edgelist_csv, memory_budget=8 << 30)
+    pr = sharded_pagerank(G)
+
+The shard size is chosen so that the per-node vectors and the temporaries of
+one shard stay within memory_budget; the same budget bounds the conversion,
+which partitions the memory-mapped edge list cache in chunks and sorts one
+shard at a time. Results match pagerank_array(), hits_arrays() and bfs() up
+to floating-point summation order.
+"""
+import os
+import shutil
+import time
+
+import networkx as nx
+import numpy as np
+
+from .bfs import BFSResult, frontier_edges
+from .csr import INDEX_DTYPE, node_values
+from .edgecache import (
+    EDGE_DTYPE, default_cache_dir, edgelist_digest, is_current, load_edge_arrays, map_column,
+    read_meta, write_columns, write_meta,
+)
+
+SHARDS_FORMAT = 2
+DEFAULT_MEMORY_BUDGET = 4 << 30
+# Resident per node in sharded_pagerank(), the largest user: out_degree,
+# inv_degree, uniform, personalization, dangling weights, teleport, scaled,
+# x and xlast (8 bytes each), the dangling node ids (up to 8) and node_mask (1)
+_BYTES_PER_NODE = 96
+# Conversion temporaries per edge of a shard: raw src and dst, int64 sort
+# keys, the sort permutation and the output. Iterating needs less: the
+# gathered weights, the shifted targets and a bincount of at most one slot
+# per edge (see _scatter_add)
+_BYTES_PER_EDGE = 32
+_MIN_SHARD_EDGES = 1 << 16
+
+
+def default_shards_dir(csv_path):
+    return f"{csv_path}.shards"
+
+
+def shard_edges_for_budget(num_nodes, memory_budget):
+    """Return the largest number of edges per shard that fits in memory_budget."""
+    shard_edges = (memory_budget - num_nodes * _BYTES_PER_NODE) // _BYTES_PER_EDGE
+    if shard_edges < _MIN_SHARD_EDGES:
+        raise ValueError(
+            f"a memory budget of {memory_budget} bytes is too small for {num_nodes} nodes; "
+            f"at least {num_nodes * _BYTES_PER_NODE + _MIN_SHARD_EDGES * _BYTES_PER_EDGE} "
+            f"bytes are needed"
+        )
+    return int(shard_edges)
+
+
+def _add_counts(total, ids):
+    """Add the bincount of ids to total, growing total as needed."""
+    counts = np.bincount(ids)
+    if len(counts) > len(total):
+        total = np.concatenate([total, np.zeros(len(counts) - len(total), dtype=total.dtype)])
+    total[:len(counts)] += counts
+    return total
+
+
+def shard_bounds(out_degree, shard_edges):
+    """Return the node id boundaries of shards of at most shard_edges edges.
+
+    A node with more out-edges than shard_edges gets a shard of its own.
+    """
+    ends = np.cumsum(out_degree)
+    bounds = [0]
+    while bounds[-1] < len(out_degree):
+        start = bounds[-1]
+        before = ends[start - 1] if start else 0
+        stop = int(np.searchsorted(ends, before + shard_edges, side="right"))
+        bounds.append(max(stop, start + 1))
+    return np.array(bounds, dtype=np.int64)
+
+
+def _shard_dir(path, i):
+    return os.path.join(path, f"shard-{i:05d}")
+
+
+def _write_shard(shard_dir, start, stop, src, dst):
+    """Sort and deduplicate the edges of one shard and write its CSR slice."""
+    keys = (src - start).astype(np.int64)
+    keys <<= 32
+    keys |= dst.astype(np.int64)
+    del src, dst
+    keys.sort()
+    if len(keys) > 1:
+        unique = np.empty(len(keys), dtype=bool)
+        unique[0] = True
+        np.not_equal(keys[1:], keys[:-1], out=unique[1:])
+        keys = keys[unique]
+        del unique
+    indices = (keys & 0xFFFFFFFF).astype(EDGE_DTYPE)
+    keys >>= 32
+    out_degree = np.bincount(keys, minlength=stop - start)
+    del keys
+    indptr = np.zeros(stop - start + 1, dtype=np.int64)
+    np.cumsum(out_degree, out=indptr[1:])
+    indices.tofile(os.path.join(shard_dir, "indices.i32"))
+    np.save(os.path.join(shard_dir, "indptr.npy"), indptr)
+    write_columns(shard_dir, ["indices"], len(indices), {"start": int(start), "stop": int(stop)})
+    dst_range = (int(indices.min()), int(indices.max()) + 1) if len(indices) else (0, 0)
+    return out_degree, dst_range
+
+
+def convert_shards(edgelist, path=None, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """Split the edge list at edgelist into shards under path and return the metadata.
+
+    edgelist is an edge list CSV or its cache directory. The edges are read
+    from the memory-mapped edge list cache in three passes of chunks that fit
+    in memory_budget: degrees, partitioning into raw per-shard files, and
+    sorting each shard.
+    """
+    path = path or default_shards_dir(edgelist)
+    src, dst = load_edge_arrays(edgelist)
+    edge_cache_dir = edgelist if os.path.isdir(edgelist) else default_cache_dir(edgelist)
+    edge_meta = read_meta(edge_cache_dir)
+    tmp_dir = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    chunk = max(memory_budget // _BYTES_PER_EDGE, _MIN_SHARD_EDGES)
+    out_degree = np.zeros(0, dtype=np.int64)
+    in_degree = np.zeros(0, dtype=np.int64)
+    for start in range(0, len(src), chunk):
+        out_degree = _add_counts(out_degree, src[start:start + chunk])
+        in_degree = _add_counts(in_degree, dst[start:start + chunk])
+    num_nodes = max(len(out_degree), len(in_degree))
+    if num_nodes > np.iinfo(INDEX_DTYPE).max:
+        raise ValueError(f"too many nodes for {INDEX_DTYPE.__name__} ids: {num_nodes}")
+    out_degree.resize(num_nodes, refcheck=False)
+    in_degree.resize(num_nodes, refcheck=False)
+    node_mask = (out_degree > 0) | (in_degree > 0)
+    del in_degree
+
+    shard_edges = shard_edges_for_budget(num_nodes, memory_budget)
+    bounds = shard_bounds(out_degree, shard_edges)
+    num_shards = len(bounds) - 1
+    for i in range(num_shards):
+        os.makedirs(_shard_dir(tmp_dir, i))
+
+    # The degrees and node mask are resident now, so use shard-sized chunks
+    chunk = shard_edges
+    for start in range(0, len(src), chunk):
+        chunk_src = np.asarray(src[start:start + chunk])
+        chunk_dst = np.asarray(dst[start:start + chunk])
+        shard = np.searchsorted(bounds, chunk_src, side="right") - 1
+        order = np.argsort(shard, kind="stable")
+        splits = np.searchsorted(shard[order], np.arange(num_shards + 1))
+        for i in np.flatnonzero(np.diff(splits)).tolist():
+            rows = order[splits[i]:splits[i + 1]]
+            with open(os.path.join(_shard_dir(tmp_dir, i), "src.raw"), "ab") as f:
+                chunk_src[rows].tofile(f)
+            with open(os.path.join(_shard_dir(tmp_dir, i), "dst.raw"), "ab") as f:
+                chunk_dst[rows].tofile(f)
+        del chunk_src, chunk_dst, shard, order
+
+    shards = []
+    for i, (start, stop) in enumerate(zip(bounds[:-1].tolist(), bounds[1:].tolist())):
+        shard_dir = _shard_dir(tmp_dir, i)
+        raw = [os.path.join(shard_dir, f"{name}.raw") for name in ("src", "dst")]
+        if os.path.exists(raw[0]):
+            shard_src, shard_dst = (np.fromfile(p, dtype=EDGE_DTYPE) for p in raw)
+        else:
+            shard_src = shard_dst = np.empty(0, dtype=EDGE_DTYPE)
+        # Duplicate edges are dropped here, so the stored degrees are exact
+        out_degree[start:stop], (dst_start, dst_stop) = _write_shard(
+            shard_dir, start, stop, shard_src, shard_dst
+        )
+        del shard_src, shard_dst
+        for p in raw:
+            if os.path.exists(p):
+                os.remove(p)
+        shards.append({"start": start, "stop": stop, "dst_start": dst_start,
+                       "dst_stop": dst_stop, "num_edges": int(out_degree[start:stop].sum())})
+
+    np.save(os.path.join(tmp_dir, "out_degree.npy"), out_degree)
+    np.save(os.path.join(tmp_dir, "node_mask.npy"), node_mask)
+    meta = write_meta(tmp_dir, {
+        "format": SHARDS_FORMAT,
+        "num_nodes": num_nodes,
+        "num_edges": int(out_degree.sum()),
+        "shard_edges": shard_edges,
+        "shards": shards,
+        # The source CSV, if any, for a quick check by size and mtime, and
+        # the digest of the edges, which also identifies a binary edge list
+        "source": edge_meta.get("source"),
+        "fingerprint": edgelist_digest(edge_cache_dir, edge_meta),
+    })
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_dir, path)
+    return meta
+
+
+class Shard:
+    """The CSR slice of rows start:stop of a ShardedGraph, mapped on demand.
+
+    All targets of the shard's edges are in dst_start:dst_stop.
+    """
+
+    def __init__(self, path, start, stop, dst_start, dst_stop, num_edges):
+        self.path = path
+        self.start = start
+        self.stop = stop
+        self.dst_start = dst_start
+        self.dst_stop = dst_stop
+        self.num_edges = num_edges
+        self.indptr = None
+        self.indices = None
+
+    def __enter__(self):
+        self.indptr = np.load(os.path.join(self.path, "indptr.npy"), mmap_mode="r")
+        self.indices = map_column(self.path, "indices", self.num_edges)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Dropping the maps lets the OS reclaim the shard's pages
+        self.indptr = self.indices = None
+
+    def sources(self):
+        """Return the source id of every edge of the shard."""
+        return np.repeat(np.arange(self.start, self.stop, dtype=INDEX_DTYPE),
+                         np.diff(self.indptr))
+
+    def scatter_add(self, x, weights):
+        """Add weights[e] to x[target of e] for every edge e of the shard.
+
+        The cost is proportional to the shard's edges, not to len(x): a
+        bincount over the shard's target range if that range is no wider than
+        the number of edges, and np.add.at otherwise.
+        """
+        if self.dst_stop - self.dst_start <= self.num_edges:
+            x[self.dst_start:self.dst_stop] += np.bincount(
+                self.indices - self.dst_start, weights=weights,
+                minlength=self.dst_stop - self.dst_start,
+            )
+        else:
+            np.add.at(x, self.indices, weights)
+
+
+class ShardedGraph:
+    """A directed graph stored as source-range shards (see the module docstring).
+
+    Use load_sharded_graph() rather than calling the constructor directly.
+    """
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.num_nodes = meta["num_nodes"]
+        self.num_edges = meta["num_edges"]
+        self.shard_edges = meta["shard_edges"]
+        self.shards = [Shard(_shard_dir(path, i), s["start"], s["stop"], s["dst_start"],
+                             s["dst_stop"], s["num_edges"])
+                       for i, s in enumerate(meta["shards"])]
+        self.node_mask = np.load(os.path.join(path, "node_mask.npy"), mmap_mode="r")
+        self._out_degree = np.load(os.path.join(path, "out_degree.npy"), mmap_mode="r")
+
+    def __len__(self):
+        """The number of nodes that appear in at least one edge, like len(G)."""
+        return int(np.count_nonzero(self.node_mask))
+
+    def nodes(self):
+        return np.flatnonzero(self.node_mask).astype(INDEX_DTYPE)
+
+    def has_node(self, n):
+        return 0 <= n < self.num_nodes and bool(self.node_mask[n])
+
+    def out_degree(self):
+        return self._out_degree
+
+    def __repr__(self):
+        return (f"ShardedGraph(num_nodes={self.num_nodes}, num_edges={self.num_edges}, "
+                f"num_shards={len(self.shards)})")
+
+
+def load_sharded_graph(edgelist, memory_budget=DEFAULT_MEMORY_BUDGET, path=None, verify=False):
+    """Return the ShardedGraph of an edge list, converting it first if needed.
+
+    edgelist is an edge list CSV or an edge list cache directory. Existing
+    shards are reused if they were built from the current edge list and are no
+    larger than memory_budget allows. A CSV is checked by size and mtime (and
+    digest with verify=True), a directory by the edge digest in its metadata
+    (see edgelist_digest()).
+    """
+    path = path or default_shards_dir(edgelist)
+    meta = read_meta(path)
+    current = (meta is not None and meta.get("format") == SHARDS_FORMAT
+               and meta["shard_edges"] <= shard_edges_for_budget(meta["num_nodes"], memory_budget))
+    if current and os.path.isdir(edgelist):
+        edge_meta = read_meta(edgelist)
+        current = (edge_meta is not None
+                   and meta.get("fingerprint") == edgelist_digest(edgelist, edge_meta))
+    elif current:
+        current = is_current(meta, edgelist, verify=verify)
+    if not current:
+        meta = convert_shards(edgelist, path, memory_budget=memory_budget)
+    return ShardedGraph(path, meta)
+
+
+def sharded_pagerank(G, alpha=0.85, personalization=None, max_iter=100, tol=1.0e-6,
+                     nstart=None, dangling=None, telemetry=None):
+    """Return the PageRank of every node id of a ShardedGraph as a float64 array.
+
+    The arguments are those of pagerank_array(). Every iteration streams the
+    shards once, adding the rank each shard's sources pass along their edges
+    with a weighted bincount over the targets.
+
+    Raises nx.PowerIterationFailedConvergence if the iteration does not
+    converge within max_iter iterations.
+    """
+    N = len(G)
+    if N == 0:
+        return np.zeros(G.num_nodes, dtype=np.float64)
+
+    out_degree = G.out_degree()
+    inv_degree = np.zeros(G.num_nodes, dtype=np.float64)
+    np.divide(1.0, out_degree, out=inv_degree, where=out_degree != 0)
+    is_dangling = np.flatnonzero((out_degree == 0) & G.node_mask)
+
+    uniform = np.where(G.node_mask, 1.0 / N, 0.0)
+    if nstart is None:
+        x = uniform
+    else:
+        x = node_values(G, nstart, "nstart")
+        x /= x.sum()
+    if personalization is None:
+        p = uniform
+    else:
+        p = node_values(G, personalization, "personalization")
+        if p.sum() == 0:
+            raise ZeroDivisionError
+        p /= p.sum()
+    if dangling is None:
+        dangling_weights = p
+    else:
+        dangling_weights = node_values(G, dangling, "dangling")
+        dangling_weights /= dangling_weights.sum()
+
+    teleport = (1 - alpha) * p
+    scaled = np.empty_like(x)
+    for i in range(1, max_iter + 1):
+        st = time.perf_counter()
+        xlast = x
+        np.multiply(xlast, inv_degree, out=scaled)
+        x = np.zeros(G.num_nodes, dtype=np.float64)
+        for shard in G.shards:
+            with shard:
+                shard.scatter_add(x, np.repeat(scaled[shard.start:shard.stop],
+                                               np.diff(shard.indptr)))
+        x += xlast[is_dangling].sum() * dangling_weights
+        x *= alpha
+        x += teleport
+        # scaled is free until the next iteration, so it holds |x - xlast|
+        np.subtract(x, xlast, out=scaled)
+        err = np.absolute(scaled, out=scaled).sum()
+        if telemetry is not None:
+            telemetry.record(i, float(err), time.perf_counter() - st)
+        if err < N * tol:
+            if telemetry is not None:
+                telemetry.converged = True
+            return x
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+def sharded_hits(G, max_iter=100, tol=1.0e-8, nstart=None, normalized=True, telemetry=None):
+    """Return (hubs, authorities) of every node id of a ShardedGraph.
+
+    The arguments are those of hits_arrays(). Since every shard holds all
+    out-edges of its sources, the hub scores of a shard are complete once the
+    shard has been read, so both half-steps of an iteration take a single
+    pass over the shards.
+
+    Raises nx.PowerIterationFailedConvergence if the iteration does not
+    converge within max_iter iterations.
+    """
+    if len(G) == 0:
+        return (np.zeros(G.num_nodes, dtype=np.float64),
+                np.zeros(G.num_nodes, dtype=np.float64))
+    if max_iter <= 0:
+        raise nx.PowerIterationFailedConvergence(max_iter)
+
+    if nstart is None:
+        x = np.where(G.node_mask, 1.0 / len(G), 0.0)
+    else:
+        x = node_values(G, nstart, "nstart")
+        x /= x.sum()
+
+    for i in range(1, max_iter + 1):
+        st = time.perf_counter()
+        xlast = x
+        x = np.zeros(G.num_nodes, dtype=np.float64)
+        for shard in G.shards:
+            with shard:
+                # h = A @ xlast for the shard's rows, then x += A.T @ h over its edges
+                rows = shard.sources() - shard.start
+                h_shard = np.bincount(rows, weights=xlast[shard.indices],
+                                      minlength=shard.stop - shard.start)
+                shard.scatter_add(x, h_shard[rows])
+        x /= x.max()
+        # xlast is not needed after the error, so it holds |x - xlast|
+        err = np.absolute(np.subtract(x, xlast, out=xlast), out=xlast).sum()
+        if telemetry is not None:
+            telemetry.record(i, float(err), time.perf_counter() - st)
+        if err < tol:
+            if telemetry is not None:
+                telemetry.converged = True
+            break
+    else:
+        raise nx.PowerIterationFailedConvergence(max_iter)
+
+    a = x
+    h = np.zeros(G.num_nodes, dtype=np.float64)
+    for shard in G.shards:
+        with shard:
+            h[shard.start:shard.stop] = np.bincount(
+                shard.sources() - shard.start, weights=a[shard.indices],
+                minlength=shard.stop - shard.start,
+            )
+    if normalized:
+        h /= h.sum()
+        a /= a.sum()
+    return h, a
+
+
+def sharded_bfs(G, source):
+    """Run a level-synchronous BFS over a ShardedGraph from source.
+
+    Returns a BFSResult like bfs(). Each level only maps the shards whose
+    source range holds nodes of the frontier.
+    """
+    if not G.has_node(source):
+        raise nx.NodeNotFound(f"Source {source} is not in G")
+    distance = np.full(G.num_nodes, -1, dtype=np.int32)
+    predecessor = np.full(G.num_nodes, -1, dtype=np.int32)
+    distance[source] = 0
+    starts = np.array([shard.start for shard in G.shards])
+    frontier = np.array([source], dtype=np.int32)
+    level = 0
+    while len(frontier):
+        level += 1
+        # frontier is sorted, so each shard's part of it is a contiguous slice
+        splits = np.searchsorted(frontier, np.append(starts, G.num_nodes))
+        discovered = []
+        for i in np.flatnonzero(np.diff(splits)).tolist():
+            shard = G.shards[i]
+            with shard:
+                local = frontier[splits[i]:splits[i + 1]] - shard.start
+                parents, nbrs = frontier_edges(shard, local)
+                unvisited = distance[nbrs] == -1
+                nbrs = nbrs[unvisited]
+                predecessor[nbrs] = parents[unvisited] + shard.start
+                distance[nbrs] = level
+                discovered.append(nbrs)
+        frontier = np.unique(np.concatenate(discovered)) if discovered else frontier[:0]
+    return BFSResult(source, distance, predecessor)
@@ -0,0 +1,148 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Append-only interned string table with batch, vectorized lookups.
+
+Interning ~60M page titles in a Python dict (as archive/wikipedia2csv.py does
+with titleIndexMap, which also stores every entry a second time as int -> str)
+costs well over 100 bytes per title in str and dict entry overhead. StringTable
+stores each distinct string once, with the same two 64-bit hashes TitleIndex
+uses as its identity:
+
+    buffer    all strings concatenated as UTF-8, in id order
+    offsets   offsets[i]:offsets[i + 1] delimits the bytes of string i
+    hash1/2   the hashes of string i
+    slots     an open-addressing hash table (linear probing, at most half
+              full) mapping hash1 to string ids
+
+which is about 40 bytes per title plus its UTF-8 bytes. Strings are added and
+looked up in batches, with all hashing and probing done by NumPy:
+
+    table = StringTable()
+    ids = table.add(["SciPy", "NumPy", "SciPy"])   # -> [0, 1, 0]
+    table.strings(ids[:2])                         # -> ["SciPy", "NumPy"]
+"""
+import numpy as np
+
+from .titleindex import TitleIndex, hash_titles
+
+_EMPTY = -1
+
+
+def grow_array(values, size, fill=0):
+    """Return values with room for at least size entries, doubling as needed."""
+    if size <= len(values):
+        return values
+    grown = np.full(max(size, 2 * len(values)), fill, dtype=values.dtype)
+    grown[:len(values)] = values
+    return grown
+
+
+class StringTable:
+    """Interns strings, giving each distinct string a dense int32 id in order of addition."""
+
+    def __init__(self, capacity=1 << 16):
+        self.hash1 = np.zeros(capacity, dtype=np.uint64)
+        self.hash2 = np.zeros(capacity, dtype=np.uint64)
+        self.offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self._buffer = bytearray()
+        self._slots = np.full(2 * capacity, _EMPTY, dtype=np.int32)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return (self.hash1.nbytes + self.hash2.nbytes + self.offsets.nbytes
+                + self._slots.nbytes + len(self._buffer))
+
+    def _probe(self, hash1, hash2):
+        """Return the id of each (hash1, hash2) key, or -1 for keys not in the table."""
+        mask = np.uint64(len(self._slots) - 1)
+        ids = np.full(len(hash1), _EMPTY, dtype=np.int32)
+        pending = np.arange(len(hash1))
+        slot = (hash1 & mask).astype(np.int64)
+        while len(pending):
+            occupant = self._slots[slot]
+            occupied = occupant != _EMPTY
+            pending, slot, occupant = pending[occupied], slot[occupied], occupant[occupied]
+            found = ((self.hash1[occupant] == hash1[pending])
+                     & (self.hash2[occupant] == hash2[pending]))
+            ids[pending[found]] = occupant[found]
+            pending = pending[~found]
+            slot = (slot[~found] + 1) & (len(self._slots) - 1)
+        return ids
+
+    def _insert(self, ids):
+        """Insert ids (whose hashes are already stored) into the slot table."""
+        mask = len(self._slots) - 1
+        slot = (self.hash1[ids] & np.uint64(mask)).astype(np.int64)
+        while len(ids):
+            free = self._slots[slot] == _EMPTY
+            # Of several ids probing the same free slot, the first one takes it
+            # and the others move on.
+            claimed, first = np.unique(slot[free], return_index=True)
+            winners = np.flatnonzero(free)[first]
+            self._slots[claimed] = ids[winners]
+            rest = np.ones(len(ids), dtype=bool)
+            rest[winners] = False
+            ids, slot = ids[rest], (slot[rest] + 1) & mask
+
+    def _reserve(self, size):
+        self.hash1 = grow_array(self.hash1, size)
+        self.hash2 = grow_array(self.hash2, size)
+        self.offsets = grow_array(self.offsets, size + 1)
+        if 2 * size > len(self._slots):
+            num_slots = len(self._slots)
+            while 2 * size > num_slots:
+                num_slots *= 2
+            self._slots = np.full(num_slots, _EMPTY, dtype=np.int32)
+            self._insert(np.arange(self._size, dtype=np.int32))
+
+    def lookup(self, strings):
+        """Return the id of each string as an int32 array, -1 if not in the table."""
+        return self._probe(*hash_titles(strings))
+
+    def add(self, strings):
+        """Return the id of each string, adding the ones not yet in the table."""
+        strings = np.asarray(strings, dtype=object)
+        hash1, hash2 = hash_titles(strings)
+        ids = self._probe(hash1, hash2)
+        new = np.flatnonzero(ids == _EMPTY)
+        if len(new) == 0:
+            return ids
+
+        # Give each distinct new string an id, in order of first occurrence
+        order = np.lexsort((hash2[new], hash1[new]))
+        sorted1, sorted2 = hash1[new][order], hash2[new][order]
+        starts = np.concatenate(([True], (sorted1[1:] != sorted1[:-1]) | (sorted2[1:] != sorted2[:-1])))
+        group = np.cumsum(starts) - 1
+        first = new[order[starts]]
+        by_position = np.argsort(first)
+        rank = np.empty_like(by_position)
+        rank[by_position] = np.arange(len(first))
+        ids[new[order]] = self._size + rank[group]
+
+        first = first[by_position]
+        added = np.arange(self._size, self._size + len(first), dtype=np.int32)
+        self._reserve(self._size + len(first))
+        self.hash1[added] = hash1[first]
+        self.hash2[added] = hash2[first]
+        encoded = [s.encode("utf-8") for s in strings[first]]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        self.offsets[added + 1] = self.offsets[self._size] + np.cumsum(lengths)
+        self._buffer += b"".join(encoded)
+        self._size += len(first)
+        self._insert(added)
+        return ids
+
+    def strings(self, ids):
+        """Return the string of each id as a list."""
+        ids = np.asarray(ids, dtype=np.int64)
+        starts = self.offsets[ids].tolist()
+        stops = self.offsets[ids + 1].tolist()
+        buffer = self._buffer
+        return [buffer[start:stop].decode("utf-8") for start, stop in zip(starts, stops)]
+
+    def to_title_index(self, ids):
+        """Return a TitleIndex mapping the string of ids[n] to node id n."""
+        return TitleIndex.from_titles(self.strings(ids))
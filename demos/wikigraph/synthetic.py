@@ -0,0 +1,231 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Synthetic Wikipedia-like input files at a configurable scale.
+
+The demos need the files written by wikipedia2csv from a 20 GB dump. For
+benchmarks and quick experiments, generate() writes files of the same formats
+from a random model with the skew that matters for performance:
+
+    edges.csv       "src dst" links. Sources and targets are drawn from
+                    power laws (in-degree exponent 2.1, out-degree exponent
+                    2.6, as measured for Wikipedia), so a few hub pages have
+                    most of the links, as in the real graph.
+    nodes.csv       "nodeid<TAB>title". About a quarter of the pages are in
+                    other namespaces than the articles (Category:, User:,
+                    Talk:, ...). Node ids 0-3 are the "SciPy", "Orange juice",
+                    "Lake Leon (Florida)" and "Kevin Bacon" articles the
+                    demos look up, linked through a hub.
+    redirects.csv   "title<TAB>target title" of redirect pages, some of them
+                    redirecting to other redirects. Redirects have no node id.
+    revisions.csv   "title<TAB>editor" of every revision. Popular pages (and
+                    some redirects and deleted pages) get most revisions, and
+                    editor activity follows a power law, with bots among the
+                    most active editors.
+
+Everything is derived from a seed, so the files of a scale are identical on
+every machine:
+
+    python -m wikigraph.synthetic synthetic/10M --edges 10_000_000
+"""
+import argparse
+import os
+
+import numpy as np
+
+from .edgecache import read_meta, write_meta
+from .edgewriter import write_edgelist
+from .namespaces import MAIN, NAMESPACES
+
+DEMO_ARTICLES = ("SciPy", "Orange juice", "Lake Leon (Florida)", "Kevin Bacon")
+# Share of pages in each namespace
+NAMESPACE_MIX = {MAIN: 0.75, 14: 0.06, 2: 0.06, 1: 0.05, 10: 0.03, 6: 0.03, 4: 0.02}
+IN_DEGREE_EXPONENT = 2.1
+OUT_DEGREE_EXPONENT = 2.6
+EDITOR_EXPONENT = 1.2
+GENERATOR_VERSION = 1
+_CHUNKSIZE = 1 << 22
+# Lines of text formatted at a time
+_LINES_CHUNKSIZE = 1 << 20
+_PREFIXES = {}
+for _name, _number in NAMESPACES.items():
+    _PREFIXES.setdefault(_number, f"{_name}:")
+
+
+class SyntheticFiles:
+    """The paths of a generated data set."""
+
+    def __init__(self, path):
+        self.path = path
+        self.edgelist_csv = os.path.join(path, "edges.csv")
+        self.nodedata_csv = os.path.join(path, "nodes.csv")
+        self.redirects_csv = os.path.join(path, "redirects.csv")
+        self.revisions_csv = os.path.join(path, "revisions.csv")
+
+    def __repr__(self):
+        return f"SyntheticFiles({self.path!r})"
+
+
+def powerlaw_sampler(num_items, exponent, rng):
+    """Return a function drawing item ids with P(degree >= d) ~ d ** (1 - exponent).
+
+    Items are ranked in a random order, and rank r gets weight
+    (r + 1) ** (-1 / (exponent - 1)), which gives a degree distribution with
+    the requested exponent.
+    """
+    weights = np.arange(1, num_items + 1, dtype=np.float64) ** (-1 / (exponent - 1))
+    cdf = np.cumsum(weights)
+    cdf /= cdf[-1]
+    items = rng.permutation(num_items).astype(np.int32)
+
+    def sample(size):
+        ranks = np.searchsorted(cdf, rng.random(size), side="right")
+        return items[np.minimum(ranks, num_items - 1)]
+
+    return sample
+
+
+def page_titles(num_nodes, rng):
+    """Return the titles of num_nodes pages, with namespaces drawn from NAMESPACE_MIX."""
+    numbers = np.array(list(NAMESPACE_MIX))
+    shares = np.array(list(NAMESPACE_MIX.values()))
+    namespace = rng.choice(numbers, size=num_nodes, p=shares / shares.sum())
+    namespace[:len(DEMO_ARTICLES)] = MAIN
+    titles = [f"{_PREFIXES.get(ns, '')}Page {i}" for i, ns in enumerate(namespace.tolist())]
+    titles[:len(DEMO_ARTICLES)] = DEMO_ARTICLES
+    return titles
+
+
+def editor_names(num_editors):
+    """Return editor names by activity rank; some of the most active are bots."""
+    names = [f"Editor{k}" for k in range(num_editors)]
+    for k in range(3, min(num_editors, 1000), 10):
+        names[k] = f"SyntheticBot{k}"
+    # Names that only the naive substring test takes for bots
+    for k in range(7, num_editors, 50):
+        names[k] = f"Abbott{k}"
+    return names
+
+
+def _write_lines(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        for start in range(0, len(lines), _LINES_CHUNKSIZE):
+            f.write("".join(lines[start:start + _LINES_CHUNKSIZE]))
+
+
+def generate(path, num_edges, avg_degree=20, revisions_per_edge=0.5, redirect_fraction=0.3,
+             seed=0, force=False, verbose=False):
+    """Write a synthetic data set with about num_edges links to the directory path.
+
+    Returns the SyntheticFiles. If path already holds a data set generated
+    with the same parameters, it is reused unless force is set.
+    """
+    params = {
+        "generator": GENERATOR_VERSION,
+        "num_edges": int(num_edges),
+        "avg_degree": avg_degree,
+        "revisions_per_edge": revisions_per_edge,
+        "redirect_fraction": redirect_fraction,
+        "seed": seed,
+    }
+    files = SyntheticFiles(path)
+    meta = read_meta(path)
+    if not force and meta is not None and meta.get("params") == params:
+        return files
+
+    os.makedirs(path, exist_ok=True)
+    if meta is not None:
+        os.remove(os.path.join(path, "meta.json"))
+    rng = np.random.default_rng(seed)
+    num_nodes = max(int(num_edges // avg_degree), 2 * len(DEMO_ARTICLES))
+
+    def log(msg):
+        if verbose:
+            print(msg, flush=True)
+
+    log(f"Writing {num_nodes} page titles...")
+    titles = page_titles(num_nodes, rng)
+    _write_lines(files.nodedata_csv, [f"{i}\t{t}\n" for i, t in enumerate(titles)])
+
+    log(f"Writing {num_edges} links...")
+    sources = powerlaw_sampler(num_nodes, OUT_DEGREE_EXPONENT, rng)
+    targets = powerlaw_sampler(num_nodes, IN_DEGREE_EXPONENT, rng)
+    src = np.empty(num_edges, dtype=np.int32)
+    dst = np.empty(num_edges, dtype=np.int32)
+    for start in range(0, num_edges, _CHUNKSIZE):
+        size = min(_CHUNKSIZE, num_edges - start)
+        src[start:start + size] = sources(size)
+        dst[start:start + size] = targets(size)
+    # SciPy -> hub -> the other demo articles, so their shortest paths exist
+    hub = int(np.bincount(dst[:_CHUNKSIZE], minlength=num_nodes).argmax())
+    src[:len(DEMO_ARTICLES)] = [0, hub, hub, hub]
+    dst[:len(DEMO_ARTICLES)] = [hub, 1, 2, 3]
+    loops = src == dst
+    write_edgelist(files.edgelist_csv, src[~loops], dst[~loops])
+    del src, dst
+
+    log("Writing redirects...")
+    num_redirects = int(num_nodes * redirect_fraction)
+    redirect_titles = [f"Redirect {k}" for k in range(num_redirects)]
+    redirect_target = rng.integers(0, num_nodes, num_redirects)
+    # One in ten redirects leads to another redirect instead of a page
+    chained = np.flatnonzero(rng.random(num_redirects) < 0.1)
+    chained = chained[chained > 0]
+    chain_to = rng.integers(0, chained, len(chained)) if len(chained) else chained
+    targets_of = [titles[t] for t in redirect_target.tolist()]
+    for k, j in zip(chained.tolist(), chain_to.tolist()):
+        targets_of[k] = redirect_titles[j]
+    _write_lines(files.redirects_csv,
+                 [f"{r}\t{t}\n" for r, t in zip(redirect_titles, targets_of)])
+
+    num_revisions = int(num_edges * revisions_per_edge)
+    log(f"Writing {num_revisions} revisions...")
+    # Pages, then redirects, then deleted pages that are not in the node file
+    num_deleted = max(num_nodes // 50, 1)
+    revised_titles = titles + redirect_titles + [f"Deleted page {k}" for k in range(num_deleted)]
+    revised = powerlaw_sampler(len(revised_titles), IN_DEGREE_EXPONENT, rng)
+    num_editors = max(num_revisions // 50, 100)
+    editors = editor_names(num_editors)
+    # editor_names() lists editors by rank, so draw ranks rather than shuffled ids
+    weights = np.arange(1, num_editors + 1, dtype=np.float64) ** -EDITOR_EXPONENT
+    editor_cdf = np.cumsum(weights) / weights.sum()
+    with open(files.revisions_csv, "w", encoding="utf-8") as f:
+        for start in range(0, num_revisions, _LINES_CHUNKSIZE):
+            size = min(_LINES_CHUNKSIZE, num_revisions - start)
+            pages = revised(size).tolist()
+            ranks = np.minimum(np.searchsorted(editor_cdf, rng.random(size), side="right"),
+                               num_editors - 1).tolist()
+            f.write("".join(f"{revised_titles[p]}\t{editors[e]}\n" for p, e in zip(pages, ranks)))
+
+    write_meta(path, {"params": params, "num_nodes": num_nodes,
+                      "num_redirects": num_redirects, "num_revisions": num_revisions})
+    return files
+
+
+def parse_count(text):
+    """Parse counts like "10M", "2.5k" or "1_000_000"."""
+    text = text.replace("_", "").strip()
+    scale = {"k": 10**3, "m": 10**6, "g": 10**9, "b": 10**9}.get(text[-1:].lower())
+    return int(float(text[:-1]) * scale) if scale else int(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m wikigraph.synthetic",
+        description="Write synthetic Wikipedia-like edge, node, redirect and revision files.",
+    )
+    parser.add_argument("output_dir")
+    parser.add_argument("--edges", type=parse_count, default=10**6,
+                        help="number of links, e.g. 1M or 100M (default 1M)")
+    parser.add_argument("--avg-degree", type=float, default=20)
+    parser.add_argument("--revisions-per-edge", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--force", action="store_true", help="regenerate existing files")
+    args = parser.parse_args(argv)
+
+    files = generate(args.output_dir, args.edges, avg_degree=args.avg_degree,
+                     revisions_per_edge=args.revisions_per_edge, seed=args.seed,
+                     force=args.force, verbose=True)
+    print(files)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# Copyright (c) 2024, NVIDIA CORPORATION.
+"""Bidirectional title <-> nodeid index with vectorized batch lookups.
+
+Resolving titles with nodedata_df.loc[nodedata_df["title"] == t] (or nodeids
+with nodedata_df.loc[nodedata_df["nodeid"] == n]) scans the whole table for
+every lookup, and joining the revisions table with merge(on="title") hashes and
+compares Python strings for every row of both tables. TitleIndex is built once
+and answers both directions from flat arrays:
+
+    title -> nodeid   Two independent 64-bit hashes of every title, sorted, next
+                      to the nodeid of each title. A batch of titles is hashed
+                      with pd.util.hash_array() and binary-searched, all in
+                      NumPy. Requiring both hashes to match makes a false match
+                      (probability around 2**-128 per lookup) negligible.
+    nodeid -> title   All titles concatenated as UTF-8 in nodeid order, with
+                      offsets[n]:offsets[n + 1] delimiting the title of node n
+                      and present[n] telling whether node n has a title (the
+                      empty title is a title, too).
+
+Every array is saved as its own file and loaded memory-mapped, so loading the
+index is nearly free and only the pages touched by lookups are read. See
+load_title_index().
+"""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .edgecache import is_current, read_meta, source_info, write_meta
+
+# pd.util.hash_array() keys, which must be 16 bytes long
+HASH_KEYS = ("wikigraph-titles", "wikigraph-nodeid")
+INDEX_FORMAT = 3
+_ARRAYS = ("hash1", "hash2", "nodeids", "offsets")
+_PRESENT_FILE = "present.npy"
+_BUFFER_FILE = "titles.utf8"
+
+
+def hash_titles(titles):
+    """Return the two uint64 hashes used by TitleIndex for each title."""
+    titles = np.asarray(titles, dtype=object)
+    # Factorizing first pays off for large batches with repeated titles (like
+    # the revisions table) but dominates the cost of small interactive lookups.
+    if len(titles) <= 10_000:
+        return tuple(pd.util.hash_array(titles, hash_key=key, categorize=False)
+                     for key in HASH_KEYS)
+    # Factorize once and hash only the distinct titles with both keys
+    codes, uniques = pd.factorize(titles, use_na_sentinel=False)
+    return tuple(pd.util.hash_array(uniques, hash_key=key, categorize=False)[codes]
+                 for key in HASH_KEYS)
+
+
+class TitleIndex:
+    """Maps page titles to node ids and back with vectorized batch lookups."""
+
+    def __init__(self, hash1, hash2, nodeids, offsets, buffer, present=None):
+        self.hash1 = hash1
+        self.hash2 = hash2
+        self.nodeids = nodeids
+        self.offsets = offsets
+        self.buffer = buffer
+        if present is None:
+            # Indexes saved before present was stored: empty titles are missing
+            present = np.diff(offsets) > 0
+        self.present = present
+
+    @classmethod
+    def from_titles(cls, titles, nodeids=None):
+        """Build an index from titles and their node ids.
+
+        nodeids defaults to the position of each title, as in a node table
+        where row position equals nodeid. Missing titles are skipped.
+        """
+        titles = pd.Series(np.asarray(titles, dtype=object), copy=False)
+        if nodeids is None:
+            nodeids = np.arange(len(titles), dtype=np.int32)
+        present = titles.notna().to_numpy()
+        titles = titles[present]
+        nodeids = np.asarray(nodeids, dtype=np.int32)[present]
+
+        hash1, hash2 = hash_titles(titles)
+        order = np.lexsort((hash2, hash1))
+        hash1, hash2, sorted_nodeids = hash1[order], hash2[order], nodeids[order]
+
+        encoded = titles.str.encode("utf-8")
+        by_nodeid = np.argsort(nodeids, kind="stable")
+        num_nodes = int(nodeids.max()) + 1 if len(nodeids) else 0
+        lengths = np.zeros(num_nodes, dtype=np.int64)
+        lengths[nodeids] = encoded.str.len().to_numpy()
+        encoded = encoded.to_numpy()
+        offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        buffer = np.frombuffer(b"".join(encoded[by_nodeid]), dtype=np.uint8)
+        has_title = np.zeros(num_nodes, dtype=bool)
+        has_title[nodeids] = True
+        return cls(hash1, hash2, sorted_nodeids, offsets, buffer, has_title)
+
+    def __len__(self):
+        return len(self.nodeids)
+
+    @property
+    def num_nodes(self):
+        return len(self.offsets) - 1
+
+    def lookup(self, titles):
+        """Return the nodeid of each title as an int32 array, -1 if unknown or missing."""
+        titles = np.asarray(titles, dtype=object)
+        result = self.lookup_hashes(*hash_titles(titles))
+        # None and NaN hash like the titles "None" and "nan"
+        result[pd.isna(titles)] = -1
+        return result
+
+    def lookup_hashes(self, hash1, hash2):
+        """Like lookup(), for titles already hashed with hash_titles()."""
+        result = np.full(len(hash1), -1, dtype=np.int32)
+        if len(self) == 0:
+            return result
+        pos = np.searchsorted(self.hash1, hash1)
+        pending = np.flatnonzero(pos < len(self))
+        pos = pos[pending]
+        # Titles whose first hash collides with another title's are resolved by
+        # walking forward over the equal first hashes.
+        while len(pending):
+            same1 = self.hash1[pos] == hash1[pending]
+            pending, pos = pending[same1], pos[same1]
+            found = self.hash2[pos] == hash2[pending]
+            result[pending[found]] = self.nodeids[pos[found]]
+            pending, pos = pending[~found], pos[~found] + 1
+            inside = pos < len(self)
+            pending, pos = pending[inside], pos[inside]
+        return result
+
+    def nodeid(self, title):
+        """Return the nodeid of a single title, raising KeyError if unknown."""
+        nodeid = int(self.lookup([title])[0])
+        if nodeid < 0:
+            raise KeyError(title)
+        return nodeid
+
+    def __contains__(self, title):
+        return self.lookup([title])[0] >= 0
+
+    def titles(self, nodeids):
+        """Return the title of each nodeid as a list, with None for unknown ids."""
+        nodeids = np.asarray(nodeids, dtype=np.int64)
+        valid = (nodeids >= 0) & (nodeids < self.num_nodes)
+        valid[valid] = self.present[nodeids[valid]]
+        starts = np.zeros(len(nodeids), dtype=np.int64)
+        stops = np.zeros(len(nodeids), dtype=np.int64)
+        starts[valid] = self.offsets[nodeids[valid]]
+        stops[valid] = self.offsets[nodeids[valid] + 1]
+        return [self.buffer[start:stop].tobytes().decode("utf-8") if ok else None
+                for start, stop, ok in zip(starts.tolist(), stops.tolist(), valid.tolist())]
+
+    def title(self, nodeid):
+        """Return the title of a single nodeid, raising KeyError if unknown."""
+        title = self.titles([nodeid])[0]
+        if title is None:
+            raise KeyError(nodeid)
+        return title
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        np.save(os.path.join(path, _PRESENT_FILE), self.present)
+        with open(os.path.join(path, _BUFFER_FILE), "wb") as f:
+            f.write(memoryview(self.buffer))
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in _ARRAYS]
+        buffer_path = os.path.join(path, _BUFFER_FILE)
+        if os.path.getsize(buffer_path) == 0:
+            # np.memmap cannot map an empty file
+            buffer = np.empty(0, dtype=np.uint8)
+        elif mmap_mode:
+            buffer = np.memmap(buffer_path, dtype=np.uint8, mode=mmap_mode)
+        else:
+            buffer = np.fromfile(buffer_path, dtype=np.uint8)
+        present_path = os.path.join(path, _PRESENT_FILE)
+        present = (np.load(present_path, mmap_mode=mmap_mode)
+                   if os.path.exists(present_path) else None)
+        return cls(*arrays, buffer, present)
+
+
+def load_title_index(nodedata_csv, nodedata_df=None, cache_dir=None, verify=False):
+    """Return the TitleIndex for a node metadata file, building it if needed.
+
+    The index is cached in <nodedata_csv>.titles/ and rebuilt whenever the
+    CSV changes, so the CSV is only parsed on the first run. nodedata_df, if
+    given, is the already-loaded contents of nodedata_csv (with a "title"
+    column and either a "nodeid" column or an index of node ids) and saves
+    reading the file again.
+    """
+    cache_dir = cache_dir or f"{nodedata_csv}.titles"
+    meta = read_meta(cache_dir)
+    if (meta is not None and meta.get("format") == INDEX_FORMAT
+            and is_current(meta, nodedata_csv, verify=verify)):
+        return TitleIndex.load(cache_dir)
+
+    if nodedata_df is None:
+        nodedata_df = pd.read_csv(
+            nodedata_csv,
+            sep="\t",
+            names=["nodeid", "title"],
+            dtype={"nodeid": "int32", "title": "str"},
+        )
+    if "nodeid" in nodedata_df:
+        nodeids = nodedata_df["nodeid"].to_numpy()
+    else:
+        nodeids = nodedata_df.index.to_numpy()
+    index = TitleIndex.from_titles(nodedata_df["title"], nodeids)
+
+    tmp_dir = f"{cache_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    index.save(tmp_dir)
+    write_meta(tmp_dir, {
+        "format": INDEX_FORMAT,
+        "num_titles": len(index),
+        "source": source_info(nodedata_csv),
+    })
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    return TitleIndex.load(cache_dir)